@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class LibraryProjectConfig(AppConfig):
+    """
+    Project-wide hooks that belong to no single app.
+    """
+    name = 'LibraryProject'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from LibraryProject.sqlite import apply_sqlite_pragmas
+
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='apply_sqlite_pragmas')
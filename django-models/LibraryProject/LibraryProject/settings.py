@@ -38,16 +38,21 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    # Project-wide hooks, e.g. the SQLite PRAGMAs below
+    'LibraryProject.apps.LibraryProjectConfig',
     'bookshelf.apps.BookshelfConfig',
     'relationship_app.apps.RelationshipAppConfig',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'relationship_app.middleware.QueryMetricsMiddleware',
+    'relationship_app.middleware.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'relationship_app.middleware.UserRoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -58,19 +63,29 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Compile each template once per process instead of per render
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'LibraryProject.wsgi.application'
 
+# Serve the catalog views (relationship_app/async_views.py) as native async
+# views. asgi.py switches this on; WSGI deployments keep the sync views.
+ASYNC_CATALOG_VIEWS = os.environ.get('ASYNC_CATALOG_VIEWS') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -79,8 +94,148 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Reuse connections across requests, checking they are alive first
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Wait up to 20s for a lock instead of raising "database is locked"
+            'timeout': 20,
+            # Take the write lock at BEGIN, so two transactions that both read
+            # and then write cannot deadlock and fail immediately
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+}
+
+# Optional read replica for catalog reads (relationship_app/routers.py).
+# Set REPLICA_DB_PATH to a copy of the primary, e.g. a second SQLite file,
+# to enable it. Tests use the primary connection for both aliases.
+if os.environ.get('REPLICA_DB_PATH'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['REPLICA_DB_PATH'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['relationship_app.routers.CatalogReplicaRouter']
+
+# Seconds a client keeps reading from the primary after it writes
+REPLICA_PIN_SECONDS = 5
+
+# Applied to every new SQLite connection (see LibraryProject/sqlite.py) by
+# LibraryProjectConfig, which must stay in INSTALLED_APPS.
+# WAL lets readers run alongside a writer; synchronous=NORMAL is safe in
+# WAL mode and avoids an fsync per commit.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 268435456,  # 256 MB
+    'cache_size': -65536,  # 64 MB (negative values are KiB)
+    'temp_store': 'MEMORY',
+}
+
+
+# Access to /metrics (relationship_app/metrics.py), which includes raw SQL.
+# Denied unless one of these is set. Prometheus can send the token as
+# 'Authorization: Bearer <token>' (bearer_token in its scrape config).
+# Only list addresses if Django sees the scraper's own address: behind a
+# reverse proxy every client appears as the proxy, e.g. 127.0.0.1.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+METRICS_ALLOWED_IPS = []
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Library detail pages are cached in the 'library_pages' alias (see
+# relationship_app/cache.py). Local memory is enough for development and
+# tests; in production point it at a shared backend, e.g.
+#   'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+#   'LOCATION': '/var/tmp/library_cache',
+# or
+#   'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#   'LOCATION': 'redis://127.0.0.1:6379',
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'library_pages': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'library-pages',
+    },
+    # Per-book {% cache %} fragments in list_books.html/library_detail.html;
+    # one entry per book, so it needs far more than the default 300 entries.
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'template-fragments',
+        'OPTIONS': {'MAX_ENTRIES': 200000},
+    },
+}
+
+# Sessions when SESSION_MODE is 'cached_db' (see below). It must be shared
+# by every worker process: set SESSION_CACHE_URL to a Redis server, e.g.
+# redis://127.0.0.1:6379/1 (needs the redis package), or point this alias
+# at Memcached. The local memory fallback is only safe with one process.
+SESSION_CACHE_URL = os.environ.get('SESSION_CACHE_URL')
+if SESSION_CACHE_URL:
+    CACHES['sessions'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': SESSION_CACHE_URL,
     }
+else:
+    CACHES['sessions'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    }
+
+LIBRARY_PAGE_CACHE = 'library_pages'
+LIBRARY_PAGE_TIMEOUT = 600  # seconds
+
+# How long a user's role (UserProfile.role) is cached; see relationship_app/roles.py
+ROLE_CACHE_TIMEOUT = 60  # seconds
+
+# Admin changelist row counts and list_filter choices (bookshelf/admin_mixins.py)
+ADMIN_COUNT_CACHE_TIMEOUT = 300  # seconds
+ADMIN_FILTER_CACHE_TIMEOUT = 300  # seconds
+
+
+# Sessions
+# https://docs.djangoproject.com/en/5.2/topics/http/sessions/
+# SESSION_MODE (environment variable) picks the backend:
+#   'cached_db'      reads come from the 'sessions' cache and only fall back
+#                    to django_session on a miss; writes go to both. The
+#                    default when the 'sessions' cache is shared (see CACHES
+#                    above). A cached session lives as long as the session
+#                    itself, so with a per-process cache, logging out in one
+#                    worker leaves the session valid in the others.
+#   'signed_cookies' no server-side storage or queries at all; the data is
+#                    signed with SECRET_KEY but readable by the client, so
+#                    keep it small and non-sensitive. Logging out does not
+#                    revoke a copied cookie before it expires.
+#   'db'             one django_session query per request. The default
+#                    unless the 'sessions' cache is shared.
+# Compare them with `python -m benchmarks.sessions`.
+#
+# The db and cached_db backends never delete expired rows on their own;
+# schedule `python manage.py clearsessions` daily, e.g. with cron:
+#   15 3 * * * cd /srv/LibraryProject && python manage.py clearsessions
+# It is a no-op with signed_cookies, where SESSION_COOKIE_AGE alone bounds
+# a session's lifetime.
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
 }
+SESSION_MODE = os.environ.get(
+    'SESSION_MODE',
+    'db' if CACHES['sessions']['BACKEND'] == 'django.core.cache.backends.locmem.LocMemCache' else 'cached_db',
+)
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_COOKIE_AGE = 60 * 60 * 24 * 14  # two weeks, Django's default
+SESSION_COOKIE_HTTPONLY = True
 
 
 # Password validation
@@ -102,6 +257,31 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# https://docs.djangoproject.com/en/5.2/topics/auth/passwords/
+# New passwords use the first hasher; the others verify existing hashes
+# and upgrade them on login. Argon2 is used when argon2-cffi is installed,
+# otherwise scrypt from the standard library.
+
+try:
+    import argon2  # noqa: F401  (argon2-cffi)
+    _PREFERRED_HASHERS = ['bookshelf.hashers.TunedArgon2PasswordHasher']
+except ImportError:
+    _PREFERRED_HASHERS = []
+
+PASSWORD_HASHERS = _PREFERRED_HASHERS + [
+    'bookshelf.hashers.TunedScryptPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# Cost parameters; measure with `python -m benchmarks.login` before changing
+PASSWORD_HASHER_PARAMS = {
+    'argon2': {'time_cost': 2, 'memory_cost': 102400, 'parallelism': 8},
+    'scrypt': {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 5},
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -124,6 +304,26 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploads are deduplicated by content (LibraryProject/storage.py); run
+# `python manage.py gc_media_blobs` periodically to reclaim space.
+STORAGES = {
+    'default': {
+        'BACKEND': 'LibraryProject.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Profile photo processing (bookshelf/photos.py). PROFILE_PHOTO_QUEUE is
+# 'thread' or 'process' for a worker pool, or 'sync' to process inline.
+PROFILE_PHOTO_QUEUE = os.environ.get('PROFILE_PHOTO_QUEUE', 'thread')
+PROFILE_PHOTO_WORKERS = 2
+PROFILE_PHOTO_MAX_SIZE = 1024  # px, longest side of the stored photo
+PROFILE_PHOTO_SIZES = {'small': 64, 'medium': 256}  # thumbnails, px
+PROFILE_PHOTO_FORMAT = 'WEBP'
+PROFILE_PHOTO_QUALITY = 80
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
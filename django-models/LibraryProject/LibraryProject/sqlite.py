@@ -0,0 +1,20 @@
+"""
+Per-connection SQLite tuning, driven by settings.SQLITE_PRAGMAS.
+
+Connected to the connection_created signal in LibraryProjectConfig.ready()
+(LibraryProject/apps.py).
+"""
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Run the PRAGMA statements from settings.SQLITE_PRAGMAS on every new
+    SQLite connection; other database vendors are left untouched.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,119 @@
+"""
+Deduplicating media storage: the default storage for MEDIA_ROOT.
+
+Every saved file is hashed with SHA-256 while it is streamed to disk, and
+its content is kept once, as a blob under MEDIA_ROOT/.blobs/. The name a
+FileField stores is an ordinary path chosen the usual way (upload_to,
+get_available_name), but it is a hard link to the blob, so a thousand
+users uploading the same avatar take the space of one file. Deleting a
+name removes only that link; blobs left with no names are removed by
+`manage.py gc_media_blobs`.
+
+Falls back to a plain copy where hard links are not supported.
+"""
+import hashlib
+import os
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+
+BLOB_DIR = '.blobs'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage that stores each distinct content once.
+    """
+    CHUNK_SIZE = 64 * 1024
+
+    def blob_path(self, digest):
+        return self.path(os.path.join(BLOB_DIR, digest[:2], digest[2:4], digest))
+
+    def _makedirs(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        if self.directory_permissions_mode is not None:
+            os.chmod(directory, self.directory_permissions_mode)
+
+    def _write_blob(self, content):
+        """
+        Stream `content` into .blobs/tmp while hashing it, then move it to
+        its blob path unless an identical blob exists. Returns the path.
+        """
+        tmp_dir = self.path(os.path.join(BLOB_DIR, 'tmp'))
+        self._makedirs(tmp_dir)
+        digest = hashlib.sha256()
+        # Created like FileSystemStorage creates files, so the blob gets
+        # the same default permissions.
+        tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    tmp.write(chunk)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        blob = self.blob_path(digest.hexdigest())
+        self._makedirs(os.path.dirname(blob))
+        try:
+            # Creating the blob as a link fails if it exists, which makes
+            # concurrent saves of the same content safe.
+            os.link(tmp_path, blob)
+        except FileExistsError:
+            pass
+        except OSError:
+            os.replace(tmp_path, blob)
+        else:
+            if self.file_permissions_mode is not None:
+                os.chmod(blob, self.file_permissions_mode)
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        return blob
+
+    def _save(self, name, content):
+        blob = self._write_blob(content)
+        full_path = self.path(name)
+        self._makedirs(os.path.dirname(full_path))
+        while True:
+            try:
+                os.link(blob, full_path)
+            except FileExistsError:
+                # Same race as in FileSystemStorage: pick another name.
+                name = self.get_available_name(name)
+                full_path = self.path(name)
+            except FileNotFoundError:
+                # Collected between writing and linking; write it again.
+                blob = self._write_blob(content)
+            except OSError:
+                # No hard links here (e.g. another filesystem): copy.
+                with open(blob, 'rb') as src, open(full_path, 'xb') as dst:
+                    while chunk := src.read(self.CHUNK_SIZE):
+                        dst.write(chunk)
+                break
+            else:
+                break
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        name = os.path.relpath(full_path, self.location)
+        return str(name).replace('\\', '/')
+
+    def iter_blobs(self):
+        """
+        Yield (path, stat) for every stored blob.
+        """
+        root = self.path(BLOB_DIR)
+        for directory, dirnames, filenames in os.walk(root):
+            if directory == root:
+                dirnames[:] = [d for d in dirnames if d != 'tmp']
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                yield path, os.stat(path)
+
+    def iter_temporary_files(self):
+        tmp_dir = self.path(os.path.join(BLOB_DIR, 'tmp'))
+        if os.path.isdir(tmp_dir):
+            for entry in os.scandir(tmp_dir):
+                yield entry.path, entry.stat()
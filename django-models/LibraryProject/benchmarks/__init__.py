@@ -0,0 +1,9 @@
+"""
+Performance benchmarks for LibraryProject.
+
+Each module can be run on its own from the project directory, e.g.
+
+    python -m benchmarks.indexes --books 1000000
+
+and builds its fixture in a throwaway test database, never in db.sqlite3.
+"""
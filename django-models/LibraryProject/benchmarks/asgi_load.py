@@ -0,0 +1,95 @@
+"""
+HTTP load test of the catalog pages served by uvicorn (asgi.py, async
+views) versus gunicorn (wsgi.py, sync views).
+
+Both servers run against the database configured in settings, so migrate
+and seed it first, e.g. with `python manage.py import_books`. Requires
+uvicorn and gunicorn to be installed.
+
+    python -m benchmarks.asgi_load --requests 5000 --concurrency 50
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import PROJECT_DIR, report
+
+SERVERS = {
+    'asgi (uvicorn)': ['uvicorn', 'LibraryProject.asgi:application', '--workers', '{workers}',
+                       '--port', '{port}', '--log-level', 'warning', '--no-access-log'],
+    'wsgi (gunicorn)': ['gunicorn', 'LibraryProject.wsgi:application', '--workers', '{workers}',
+                        '--threads', '4', '--bind', '127.0.0.1:{port}', '--log-level', 'warning'],
+}
+
+
+def wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError(f'Server did not come up at {url}')
+
+
+def fetch(url):
+    started = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=30) as response:
+        response.read()
+    return time.perf_counter() - started
+
+
+def load(urls, requests, concurrency):
+    targets = [urls[i % len(urls)] for i in range(requests)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(fetch, targets))
+    elapsed = time.perf_counter() - started
+    return {
+        'requests_per_sec': round(requests / elapsed),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+def run(paths, requests=2000, concurrency=50, workers=2, port=8765):
+    results = {}
+    for name, command in SERVERS.items():
+        argv = [part.format(workers=workers, port=port) for part in command]
+        server = subprocess.Popen(argv, cwd=PROJECT_DIR)
+        try:
+            urls = [f'http://127.0.0.1:{port}{path}' for path in paths]
+            wait_until_up(urls[0])
+            load(urls, min(requests, 200), concurrency)  # warm up
+            results[name] = load(urls, requests, concurrency)
+        finally:
+            server.terminate()
+            server.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--path', action='append', dest='paths',
+                        help='Path to request (repeatable); defaults to /books/ and /library/1/')
+    args = parser.parse_args()
+    paths = args.paths or ['/books/', '/library/1/']
+    try:
+        results = run(paths, args.requests, args.concurrency, args.workers, args.port)
+    except FileNotFoundError as exc:
+        sys.exit(f'{exc.filename} is not installed')
+    report(f'Catalog load, {args.requests} requests, concurrency {args.concurrency}', results)
+
+
+if __name__ == '__main__':
+    main()
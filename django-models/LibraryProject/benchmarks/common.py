@@ -0,0 +1,115 @@
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    """
+    Make the project importable and configure Django for a standalone run.
+    """
+    if str(PROJECT_DIR) not in sys.path:
+        sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LibraryProject.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def fixture_database(alias='default'):
+    """
+    Create a fresh test database for the duration of the block and destroy
+    it afterwards, the same way the test runner does.
+    """
+    from django.db import connections
+    from django.db.backends.base.base import BaseDatabaseWrapper
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    connection = connections[alias]
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            # SQLite's close() ignores in-memory databases to protect their
+            # data; close for real so the next fixture starts empty.
+            BaseDatabaseWrapper.close(connection)
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def timed(func, repeat=5):
+    """
+    Call func `repeat` times and return timing statistics in milliseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        'min_ms': round(min(samples), 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'max_ms': round(max(samples), 3),
+    }
+
+
+def seed_catalog(books, authors=None, libraries=10, batch_size=10000):
+    """
+    Fill relationship_app with `books` books spread over `authors` authors
+    and `libraries` libraries, plus the same number of bookshelf books.
+    Returns (author_ids, library_ids).
+    """
+    from bookshelf.models import Book as ShelfBook
+    from relationship_app.models import Author, Book, Library
+
+    authors = authors or max(1, books // 20)
+    Author.objects.bulk_create(
+        [Author(name=f'Author {i:07d}') for i in range(authors)], batch_size=batch_size
+    )
+    author_ids = list(Author.objects.order_by('id').values_list('id', flat=True))
+
+    for start in range(0, books, batch_size):
+        stop = min(start + batch_size, books)
+        Book.objects.bulk_create(
+            [
+                Book(title=f'Title {i * 7919 % books:07d}', author_id=author_ids[i % authors],
+                     author_name=f'Author {i % authors:07d}')
+                for i in range(start, stop)
+            ]
+        )
+        ShelfBook.objects.bulk_create(
+            [
+                ShelfBook(title=f'Title {i * 7919 % books:07d}', author=f'Author {i % authors:07d}',
+                          publication_year=1900 + i % 125)
+                for i in range(start, stop)
+            ]
+        )
+
+    Library.objects.bulk_create([Library(name=f'Library {i:04d}') for i in range(libraries)])
+    library_ids = list(Library.objects.order_by('id').values_list('id', flat=True))
+    Membership = Library.books.through
+    book_ids = Book.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=batch_size)
+    memberships = []
+    for n, book_id in enumerate(book_ids):
+        memberships.append(Membership(library_id=library_ids[n % libraries], book_id=book_id))
+        if len(memberships) >= batch_size:
+            Membership.objects.bulk_create(memberships)
+            memberships = []
+    Membership.objects.bulk_create(memberships)
+    return author_ids, library_ids
+
+
+def report(title, results):
+    """
+    Print a results mapping as an aligned table.
+    """
+    print(title)
+    width = max(len(name) for name in results)
+    for name, value in results.items():
+        print(f'  {name:<{width}}  {value}')
@@ -0,0 +1,61 @@
+"""
+Query plans and timings for the hot lookups with and without the indexes
+added in relationship_app 0002 / bookshelf 0002.
+
+The "before" numbers run the same SQL with SQLite's NOT INDEXED clause,
+which is what the planner had to do before the indexes existed.
+
+    python -m benchmarks.indexes --books 1000000
+"""
+import argparse
+
+from benchmarks.common import fixture_database, report, seed_catalog, setup_django, timed
+
+# (name, SQL with a {hint} placeholder after the table name, params)
+QUERIES = [
+    ('author by name',
+     'SELECT id FROM relationship_app_author {hint} WHERE name = %s', ['Author 0000042']),
+    ('library by name',
+     'SELECT id FROM relationship_app_library {hint} WHERE name = %s', ['Library 0003']),
+    ('books by author, by title',
+     'SELECT id, title FROM relationship_app_book {hint} WHERE author_id = %s ORDER BY title', [42]),
+    ('book keyset page',
+     'SELECT id, title FROM relationship_app_book {hint} WHERE title > %s ORDER BY title, id LIMIT 50', ['Title 0500000']),
+    ('shelf books by year',
+     'SELECT id, title FROM bookshelf_book {hint} WHERE publication_year = %s ORDER BY title LIMIT 25', [1984]),
+    ('shelf books by author',
+     'SELECT id FROM bookshelf_book {hint} WHERE author = %s', ['Author 0000042']),
+]
+
+
+def query_plan(cursor, sql, params):
+    cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+    return '; '.join(row[-1] for row in cursor.fetchall())
+
+
+def run(books=100000, repeat=5):
+    results = {}
+    with fixture_database() as connection:
+        seed_catalog(books)
+        with connection.cursor() as cursor:
+            for name, sql, params in QUERIES:
+                for label, hint in (('before', 'NOT INDEXED'), ('after', '')):
+                    statement = sql.format(hint=hint)
+                    results[f'{name} [{label}]'] = {
+                        'plan': query_plan(cursor, statement, params),
+                        **timed(lambda: cursor.execute(statement, params).fetchall(), repeat),
+                    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    setup_django()
+    report(f'Index benchmark, {args.books} books', run(args.books, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
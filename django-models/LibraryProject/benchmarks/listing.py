@@ -0,0 +1,76 @@
+"""
+CPU time and memory of building a 100k-row list_books page from Book
+model instances versus the read-only rows of Book.objects.listing().
+
+Each variant loads the same rows in list_books order; the page is then
+rendered with relationship_app/list_books.html (fragment cache warm).
+Peak memory is measured with tracemalloc in a separate pass, so it does
+not slow down the timed runs.
+
+    python -m benchmarks.listing --books 100000
+"""
+import argparse
+import tracemalloc
+
+from benchmarks.common import fixture_database, report, seed_catalog, setup_django, timed
+
+
+def variants():
+    from relationship_app.models import BOOK_LIST_FIELDS, Book
+
+    return {
+        # list_books before author_name was denormalized
+        'model instances + author join': lambda: Book.objects.select_related('author'),
+        'model instances, list fields only': lambda: Book.objects.only(*BOOK_LIST_FIELDS),
+        'listing() rows': lambda: Book.objects.listing(),
+    }
+
+
+def peak_memory(func):
+    """
+    Return (peak, retained) bytes allocated while running func.
+    """
+    tracemalloc.start()
+    try:
+        result = func()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak, retained
+
+
+def run(books=100000, repeat=5):
+    from django.template.loader import get_template
+
+    template = get_template('relationship_app/list_books.html')
+    results = {}
+    with fixture_database():
+        seed_catalog(books)
+        for name, queryset in variants().items():
+            def fetch():
+                return list(queryset().order_by('title', 'id')[:books])
+
+            rows = fetch()
+            template.render({'books': rows})  # fill the fragment cache
+            peak, retained = peak_memory(fetch)
+            results[name] = {
+                'fetch': timed(fetch, repeat),
+                'render': timed(lambda: template.render({'books': rows}), repeat),
+                'peak_mb': round(peak / 1024 / 1024, 1),
+                'retained_mb': round(retained / 1024 / 1024, 1),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    setup_django()
+    report(f'list_books rows, {args.books} books', run(args.books, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Login throughput of each configured password hasher, to tune
+settings.PASSWORD_HASHER_PARAMS against the peak login rate.
+
+For every hasher in settings.PASSWORD_HASHERS this measures the cost of one
+password check in a single process and the aggregate rate of a process pool
+(one process per gunicorn worker), then estimates how many cores the peak
+needs. A full authenticate() round trip, as done by CustomLoginView, is
+measured for the default hasher against a test database.
+
+    python -m benchmarks.login --peak-per-minute 2000 --workers 4
+"""
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.common import report, setup_django, timed
+
+PASSWORD = 'correct horse battery staple'
+
+
+def _verify_many(encoded, count):
+    from django.contrib.auth.hashers import check_password
+
+    for _ in range(count):
+        check_password(PASSWORD, encoded)
+    return count
+
+
+def pool_rate(encoded, workers, seconds):
+    """
+    Password checks per second across `workers` processes.
+    """
+    from benchmarks.common import setup_django as initializer
+
+    per_task = max(1, int(_measure_rate(encoded) * seconds / 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as pool:
+        # Warm the workers up so process start-up is not measured.
+        list(pool.map(_verify_many, [encoded] * workers, [1] * workers))
+        started = time.perf_counter()
+        done = sum(pool.map(_verify_many, [encoded] * workers * 4, [per_task] * workers * 4))
+        return done / (time.perf_counter() - started)
+
+
+def _measure_rate(encoded, count=5):
+    started = time.perf_counter()
+    _verify_many(encoded, count)
+    return count / (time.perf_counter() - started)
+
+
+def run_hashers(peak_per_minute=2000, workers=None, seconds=2, repeat=10):
+    from django.contrib.auth.hashers import get_hashers, make_password
+
+    workers = workers or os.cpu_count() or 1
+    peak_per_second = peak_per_minute / 60
+    results = {}
+    for hasher in get_hashers():
+        encoded = make_password(PASSWORD, hasher=hasher.algorithm)
+        timing = timed(lambda: _verify_many(encoded, 1), repeat)
+        per_core = 1000 / timing['median_ms']
+        results[hasher.algorithm] = {
+            **timing,
+            'logins_per_sec_per_core': round(per_core, 1),
+            f'logins_per_sec_{workers}_procs': round(pool_rate(encoded, workers, seconds), 1),
+            'cores_for_peak': math.ceil(peak_per_second / per_core),
+        }
+    return results
+
+
+def run_authenticate(repeat=10):
+    """
+    Time django.contrib.auth.authenticate(), the work CustomLoginView does
+    per login: one user lookup plus one password check.
+    """
+    from django.contrib.auth import authenticate, get_user_model
+
+    from benchmarks.common import fixture_database
+
+    with fixture_database():
+        get_user_model().objects.create_user(email='bench@example.com', username='bench', password=PASSWORD)
+        return timed(lambda: authenticate(None, username='bench@example.com', password=PASSWORD), repeat)
+
+
+def run(peak_per_minute=2000, workers=None, seconds=2, repeat=10):
+    results = run_hashers(peak_per_minute, workers, seconds, repeat)
+    results['authenticate (default hasher)'] = run_authenticate(repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--peak-per-minute', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seconds', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    setup_django()
+    report(
+        f'Login throughput, peak {args.peak_per_minute} logins/min',
+        run(args.peak_per_minute, args.workers, args.seconds, args.repeat),
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Queries and latency per authenticated request for each session backend in
+settings.SESSION_ENGINES, on book-list and admin-view.
+
+A user with the Admin role logs in once per backend; the pages are then
+requested repeatedly and the SQL each request runs is counted, separating
+django_session queries from the rest.
+
+    python -m benchmarks.sessions --books 1000 --requests 50
+"""
+import argparse
+import time
+
+from benchmarks.common import report, seed_catalog, setup_django
+
+PAGES = ['book-list', 'admin-view']
+PASSWORD = 'correct horse battery staple'
+
+
+def measure(engine, paths, requests):
+    from django.core.cache import caches
+    from django.db import connection
+    from django.test import Client, override_settings
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+
+    with override_settings(SESSION_ENGINE=engine):
+        caches['sessions'].clear()
+        client = Client()
+        client.post(reverse('login'), {'username': 'bench@example.com', 'password': PASSWORD})
+        if '_auth_user_id' not in client.session:
+            raise RuntimeError(f'Login failed with {engine}')
+        session_queries = queries = 0
+        started = time.perf_counter()
+        for n in range(requests):
+            with CaptureQueriesContext(connection) as captured:
+                client.get(paths[n % len(paths)])
+            queries += len(captured)
+            session_queries += sum('django_session' in query['sql'] for query in captured)
+        elapsed = time.perf_counter() - started
+    return {
+        'queries_per_request': round(queries / requests, 2),
+        'session_queries_per_request': round(session_queries / requests, 2),
+        'ms_per_request': round(elapsed * 1000 / requests, 3),
+    }
+
+
+def run(books=1000, requests=50):
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.urls import reverse
+
+    from benchmarks.common import fixture_database
+    from relationship_app.models import UserProfile
+
+    with fixture_database():
+        seed_catalog(books)
+        user = get_user_model().objects.create_user(email='bench@example.com', username='bench', password=PASSWORD)
+        UserProfile.objects.update_or_create(user=user, defaults={'role': 'Admin'})
+        paths = [reverse(name) for name in PAGES]
+        # Hash the password once up front so scrypt does not dominate.
+        measure(settings.SESSION_ENGINE, paths, 1)
+        return {mode: measure(engine, paths, requests) for mode, engine in settings.SESSION_ENGINES.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+    setup_django()
+    report(f'Session backends, {args.requests} requests to {", ".join(PAGES)}', run(args.books, args.requests))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Concurrent read/write throughput of a file-backed SQLite database with the
+default configuration versus settings.SQLITE_PRAGMAS plus a busy timeout.
+
+Each worker process stands in for a gunicorn worker and runs a mix of
+catalog reads and small write transactions for a fixed duration.
+
+    python -m benchmarks.sqlite_concurrency --workers 8 --seconds 10
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.common import report, setup_django
+
+SCHEMA = [
+    'CREATE TABLE book (id INTEGER PRIMARY KEY, title TEXT NOT NULL, author_id INTEGER NOT NULL)',
+    'CREATE INDEX book_author ON book (author_id)',
+]
+
+
+def create_database(path, rows):
+    db = sqlite3.connect(path)
+    for statement in SCHEMA:
+        db.execute(statement)
+    db.executemany(
+        'INSERT INTO book (title, author_id) VALUES (?, ?)',
+        ((f'Title {i}', i % 1000) for i in range(rows)),
+    )
+    db.commit()
+    db.close()
+
+
+def worker(path, pragmas, timeout, seconds, write_ratio, seed, results):
+    db = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    for name, value in pragmas.items():
+        db.execute(f'PRAGMA {name} = {value}')
+    reads = writes = locked = 0
+    n = seed
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        n += 1
+        try:
+            if n % 100 < write_ratio * 100:
+                db.execute('BEGIN IMMEDIATE')
+                db.execute('INSERT INTO book (title, author_id) VALUES (?, ?)', (f'New {n}', n % 1000))
+                db.execute('COMMIT')
+                writes += 1
+            else:
+                db.execute('SELECT id, title FROM book WHERE author_id = ? LIMIT 50', (n % 1000,)).fetchall()
+                reads += 1
+        except sqlite3.OperationalError:
+            locked += 1
+            if db.in_transaction:
+                db.execute('ROLLBACK')
+    db.close()
+    results.put((reads, writes, locked))
+
+
+def run_mode(pragmas, timeout, workers=8, seconds=5, rows=100000, write_ratio=0.1):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.sqlite3')
+        create_database(path, rows)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(path, pragmas, timeout, seconds, write_ratio, i * 7, results))
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        totals = [sum(values) for values in zip(*(results.get() for _ in processes))]
+        for process in processes:
+            process.join()
+    reads, writes, locked = totals
+    return {
+        'ops_per_sec': round((reads + writes) / seconds),
+        'reads': reads,
+        'writes': writes,
+        'locked_errors': locked,
+    }
+
+
+def run(workers=8, seconds=5, rows=100000, write_ratio=0.1):
+    from django.conf import settings
+
+    timeout = settings.DATABASES['default'].get('OPTIONS', {}).get('timeout', 5)
+    return {
+        # Django's defaults: rollback journal, synchronous=FULL and the 5s
+        # busy timeout of Python's sqlite3 module
+        'stock (no pragmas, 5s timeout)': run_mode({}, 5, workers, seconds, rows, write_ratio),
+        'tuned (SQLITE_PRAGMAS + timeout)': run_mode(settings.SQLITE_PRAGMAS, timeout, workers, seconds, rows, write_ratio),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seconds', type=int, default=5)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--write-ratio', type=float, default=0.1)
+    args = parser.parse_args()
+    setup_django()
+    report(
+        f'SQLite concurrency, {args.workers} workers, {args.seconds}s each',
+        run(args.workers, args.seconds, args.rows, args.write_ratio),
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Performance regression suite: times the catalog views, the lookups from
+relationship_app/query_samples.py, the admin changelists and the bulk
+import at several catalog sizes, and checks each case against a query
+budget. Run it through `python manage.py bench`, which writes the results
+as JSON for comparison across commits.
+"""
+import csv
+import os
+import tempfile
+
+from benchmarks.common import fixture_database, seed_catalog, timed
+
+DEFAULT_SIZES = [1000]
+
+# Queries each case may run. A case over budget fails the run, since the
+# count is a deterministic stand-in for how the case scales.
+QUERY_BUDGETS = {
+    'list_books first page': 2,
+    'list_books deep page': 2,
+    'library detail (uncached)': 2,
+    'library detail (cached)': 0,
+    'books by author name': 1,
+    'books in library': 2,
+    'librarian of library': 1,
+    # The admin cases include the logged-in client's django_session read,
+    # made with the default SESSION_MODE (db) when no shared cache is set.
+    'admin changelist relationship_app.book': 5,
+    'admin changelist bookshelf.book': 4,
+}
+
+IMPORT_ROWS = 10000
+
+
+def count_queries(func):
+    """
+    Run func once and return the number of queries it executed.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as captured:
+        func()
+    return len(captured)
+
+
+def clear_caches():
+    from django.core.cache import caches
+
+    for alias in caches:
+        caches[alias].clear()
+
+
+def build_cases(library_ids):
+    """
+    Return {name: callable} for the read-only cases. Each callable must
+    succeed on its own, since it is run once to count queries and then
+    timed repeatedly.
+    """
+    from django.contrib.auth import get_user_model
+    from django.test import Client, RequestFactory
+
+    from relationship_app.cache import get_cache
+    from relationship_app.models import Author, Book, Library, Librarian
+    from relationship_app.pagination import encode_cursor
+    from relationship_app.views import LibraryDetailView, list_books
+
+    factory = RequestFactory()
+    library = Library.objects.get(pk=library_ids[len(library_ids) // 2])
+    middle = Book.objects.order_by('title', 'id')[Book.objects.count() // 2]
+    deep_cursor = encode_cursor(middle.title, middle.pk, 'next')
+    author_name = Author.objects.order_by('id').values_list('name', flat=True)[0]
+
+    admin = get_user_model().objects.create_superuser(email='bench@example.com', username='bench')
+    client = Client()
+    client.force_login(admin)
+
+    def check(response):
+        if response.status_code != 200:
+            raise RuntimeError(f'Unexpected status {response.status_code}')
+        return response
+
+    def library_detail():
+        response = LibraryDetailView.as_view()(factory.get(f'/library/{library.pk}/'), pk=library.pk)
+        if hasattr(response, 'render'):
+            response.render()
+        return check(response)
+
+    def library_detail_uncached():
+        get_cache().clear()
+        return library_detail()
+
+    return {
+        'list_books first page': lambda: check(list_books(factory.get('/books/'))),
+        'list_books deep page': lambda: check(list_books(factory.get('/books/', {'cursor': deep_cursor}))),
+        'library detail (uncached)': library_detail_uncached,
+        'library detail (cached)': library_detail,
+        # The lookups demonstrated in query_samples.py
+        'books by author name': lambda: list(Book.objects.filter(author__name=author_name)),
+        'books in library': lambda: list(Library.objects.get(name=library.name).books.all()),
+        'librarian of library': lambda: Librarian.objects.get(library=library),
+        'admin changelist relationship_app.book': lambda: check(client.get('/admin/relationship_app/book/')),
+        'admin changelist bookshelf.book': lambda: check(client.get('/admin/bookshelf/book/')),
+    }
+
+
+def time_import(rows, batch_size=5000):
+    """
+    Load `rows` new books with the import_books command and return its
+    timing and throughput.
+    """
+    from django.core.management import call_command
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'books.csv')
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['title', 'author'])
+            writer.writerows((f'Imported {i:07d}', f'Imported author {i % 500:04d}') for i in range(rows))
+        timing = timed(lambda: call_command('import_books', path, batch_size=batch_size, stdout=open(os.devnull, 'w')), 1)
+    return {**timing, 'rows': rows, 'rows_per_sec': round(rows / (timing['median_ms'] / 1000))}
+
+
+def run_size(books, repeat=5, import_rows=IMPORT_ROWS):
+    """
+    Seed a fresh database with `books` books and run every case against it.
+    """
+    from relationship_app.models import Librarian
+
+    results = {}
+    with fixture_database():
+        _, library_ids = seed_catalog(books)
+        Librarian.objects.bulk_create(
+            [Librarian(name=f'Librarian {library_id}', library_id=library_id) for library_id in library_ids]
+        )
+        for name, func in build_cases(library_ids).items():
+            # Counted after one warm-up run, i.e. in steady state.
+            clear_caches()
+            func()
+            queries = count_queries(func)
+            results[name] = {
+                **timed(func, repeat),
+                'queries': queries,
+                'budget': QUERY_BUDGETS.get(name),
+            }
+        results['bulk import'] = time_import(min(import_rows, books))
+    return results
+
+
+def over_budget(results):
+    """
+    Return [(size, case, queries, budget)] for cases that exceeded their budget.
+    """
+    return [
+        (size, name, case['queries'], case['budget'])
+        for size, cases in results.items()
+        for name, case in cases.items()
+        if case.get('budget') is not None and case['queries'] > case['budget']
+    ]
+
+
+def regressions(current, baseline, tolerance=0.2):
+    """
+    Compare two result sets by median time and return
+    [(size, case, baseline_ms, current_ms)] for cases that got slower by
+    more than `tolerance` (a fraction). Cases missing from either side are
+    ignored.
+    """
+    slower = []
+    for size, cases in current.items():
+        for name, case in cases.items():
+            before = baseline.get(size, {}).get(name)
+            if before and case['median_ms'] > before['median_ms'] * (1 + tolerance):
+                slower.append((size, name, before['median_ms'], case['median_ms']))
+    return slower
@@ -0,0 +1,82 @@
+"""
+Rendering cost of library_detail.html for one large library:
+
+* uncached loader, no fragment cache (the old setup: parse + full render)
+* cached loader, cold fragment cache (first render after a restart)
+* cached loader, warm fragment cache (every row served from the cache)
+* cached loader, one book edited (only that row re-rendered)
+
+    python -m benchmarks.templates --books 10000
+"""
+import argparse
+
+from benchmarks.common import fixture_database, report, setup_django, timed
+
+ORIGINAL_ROW = '<li>{{ book.title }} by {{ book.author.name }} (Published {{ book.publication_year }})</li>'
+
+
+def run(books=10000, repeat=5):
+    from django.core.cache import caches
+    from django.db.models import Prefetch
+    from django.template import Context, engines
+    from django.template.engine import Engine
+
+    from relationship_app.models import Author, Book, Library
+
+    results = {}
+    with fixture_database():
+        authors = Author.objects.bulk_create([Author(name=f'Author {i}') for i in range(max(1, books // 20))])
+        created = Book.objects.bulk_create(
+            [Book(title=f'Title {i}', author=authors[i % len(authors)]) for i in range(books)], batch_size=5000
+        )
+        library = Library.objects.create(name='Benchmark branch')
+        Library.books.through.objects.bulk_create(
+            [Library.books.through(library=library, book=book) for book in created], batch_size=5000
+        )
+        library = Library.objects.prefetch_related(
+            Prefetch('books', queryset=Book.objects.select_related('author'))
+        ).get(pk=library.pk)
+        context = {'library': library, 'books': list(library.books.all())}
+
+        # The template as it was before fragment caching, parsed on every
+        # render the way the uncached loader does.
+        source = engines['django'].engine.find_template('relationship_app/library_detail.html')[0].source
+        row_start, row_end = source.index('{% cache'), source.index('{% endcache %}') + len('{% endcache %}')
+        original_source = source[:row_start].replace('{% load cache %}\n', '') + ORIGINAL_ROW + source[row_end:]
+        plain_engine = Engine()
+
+        def render_original():
+            plain_engine.from_string(original_source).render(Context(context))
+
+        template = engines['django'].get_template('relationship_app/library_detail.html')
+
+        results['uncached loader, no fragments'] = timed(render_original, repeat)
+
+        def render_cold():
+            caches['template_fragments'].clear()
+            template.render(context)
+        results['cached loader, cold fragments'] = timed(render_cold, repeat)
+
+        template.render(context)
+        results['cached loader, warm fragments'] = timed(lambda: template.render(context), repeat)
+
+        def render_one_changed():
+            book = context['books'][0]
+            book.title += '!'
+            book.save(update_fields=['title', 'updated_at'])
+            template.render(context)
+        results['cached loader, one book changed'] = timed(render_one_changed, repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    setup_django()
+    report(f'library_detail.html, {args.books} books', run(args.books, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
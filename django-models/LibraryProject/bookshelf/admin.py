@@ -1,20 +1,22 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth import get_user_model
+from django.utils.html import format_html
+from .admin_mixins import FastChangelistMixin
 from .models import Book, CustomUser
 
 # Get the custom user model
 User = get_user_model()
 
 
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(FastChangelistMixin, UserAdmin):
     """
     Custom admin interface for the CustomUser model.
     Extends Django's built-in UserAdmin to include our custom fields.
     """
     
     # Fields to display in the user list view
-    list_display = ('username', 'email', 'first_name', 'last_name', 'date_of_birth', 'is_staff', 'date_joined')
+    list_display = ('photo_thumbnail', 'username', 'email', 'first_name', 'last_name', 'date_of_birth', 'is_staff', 'date_joined')
     
     # Fields that can be searched
     search_fields = ('username', 'email', 'first_name', 'last_name')
@@ -25,11 +27,13 @@ class CustomUserAdmin(UserAdmin):
     # Fields to display when editing a user
     fieldsets = UserAdmin.fieldsets + (
         ('Additional Information', {
-            'fields': ('date_of_birth', 'profile_photo'),
+            'fields': ('date_of_birth', 'profile_photo', 'photo_preview'),
             'classes': ('collapse',),  # Make this section collapsible
         }),
     )
     
+    readonly_fields = ('photo_preview',)
+    
     # Fields to display when creating a new user
     add_fieldsets = UserAdmin.add_fieldsets + (
         ('Additional Information', {
@@ -37,6 +41,21 @@ class CustomUserAdmin(UserAdmin):
         }),
     )
     
+    # Thumbnails from bookshelf/photos.py; the full-size upload is never shown
+    @admin.display(description='Photo')
+    def photo_thumbnail(self, obj):
+        url = obj.thumbnail_urls.get('small')
+        return format_html('<img src="{}" width="32" height="32" alt="">', url) if url else ''
+    
+    @admin.display(description='Photo preview')
+    def photo_preview(self, obj):
+        if obj.profile_photo_pending:
+            return 'Processing...'
+        if obj.profile_photo_failed:
+            return 'Not a usable image; upload another photo.'
+        url = obj.thumbnail_urls.get('medium')
+        return format_html('<img src="{}" alt="">', url) if url else '-'
+    
     # Make email field required in admin
     def get_form(self, request, obj=None, **kwargs):
         form = super().get_form(request, obj, **kwargs)
@@ -45,7 +64,7 @@ class CustomUserAdmin(UserAdmin):
         return form
 
 
-class BookAdmin(admin.ModelAdmin):
+class BookAdmin(FastChangelistMixin, admin.ModelAdmin):
     """
     Admin interface for the Book model with improved display and functionality.
     """
@@ -56,6 +75,15 @@ class BookAdmin(admin.ModelAdmin):
     
     # Add pagination for large datasets
     list_per_page = 25
+    
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Search through the FTS5 index (Book.objects.search) instead of the
+        LIKE '%term%' scans generated from search_fields.
+        """
+        if not search_term:
+            return queryset, False
+        return queryset.search(search_term), False
 
 
 # Register the models with their respective admin classes
@@ -0,0 +1,75 @@
+"""
+Password hashers whose cost parameters come from settings.PASSWORD_HASHER_PARAMS,
+so they can be tuned against login throughput without code changes.
+
+Hashes stored with other parameters still verify, and are upgraded to the
+configured ones the next time the user logs in.
+"""
+import base64
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, ScryptPasswordHasher
+
+# hashlib.scrypt rejects larger maxmem values.
+SCRYPT_MAXMEM_LIMIT = 2 ** 31 - 1
+
+
+def _params(algorithm):
+    return getattr(settings, 'PASSWORD_HASHER_PARAMS', {}).get(algorithm, {})
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id (requires argon2-cffi). Tunable: time_cost, memory_cost (KiB), parallelism.
+    """
+    @property
+    def time_cost(self):
+        return _params('argon2').get('time_cost', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return _params('argon2').get('memory_cost', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return _params('argon2').get('parallelism', Argon2PasswordHasher.parallelism)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    """
+    scrypt from the standard library. Tunable: work_factor, block_size, parallelism.
+    """
+    @property
+    def work_factor(self):
+        return _params('scrypt').get('work_factor', ScryptPasswordHasher.work_factor)
+
+    @property
+    def block_size(self):
+        return _params('scrypt').get('block_size', ScryptPasswordHasher.block_size)
+
+    @property
+    def parallelism(self):
+        return _params('scrypt').get('parallelism', ScryptPasswordHasher.parallelism)
+    
+    def encode(self, password, salt, n=None, r=None, p=None):
+        # Same as ScryptPasswordHasher.encode, except for maxmem: Django's 0
+        # means OpenSSL's 32 MiB cap, which e.g. work_factor=2**15 with
+        # block_size=8 already exceeds. scrypt needs about 128 * r * (n + p)
+        # bytes; allow twice that for each hash, whether it is new or being
+        # verified with the parameters it was stored with.
+        self._check_encode_args(password, salt)
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        hash_ = hashlib.scrypt(
+            password.encode(),
+            salt=salt.encode(),
+            n=n,
+            r=r,
+            p=p,
+            maxmem=min(256 * r * (n + p), SCRYPT_MAXMEM_LIMIT),
+            dklen=64,
+        )
+        hash_ = base64.b64encode(hash_).decode('ascii').strip()
+        return '%s$%d$%s$%d$%d$%s' % (self.algorithm, n, salt, r, p, hash_)
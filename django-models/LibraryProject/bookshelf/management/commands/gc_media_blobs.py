@@ -0,0 +1,73 @@
+import os
+import time
+
+from django.apps import apps
+from django.core.files.storage import default_storage, storages
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+
+from bookshelf.photos import referenced_photo_names
+from LibraryProject.storage import BLOB_DIR, ContentAddressedStorage
+
+
+def referenced_names(storage):
+    """
+    Return every name stored by a FileField that uses `storage`, plus the
+    processed profile photo thumbnails.
+    """
+    names = set(referenced_photo_names())
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, models.FileField) and field.storage in (storage, default_storage):
+                values = model._default_manager.exclude(**{field.name: ''}).values_list(field.name, flat=True)
+                names.update(name for name in values.iterator(chunk_size=2000) if name)
+    return names
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete media blobs no longer linked from any file name (see LibraryProject/storage.py), '
+        'and optionally file names no longer referenced from the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-seconds', type=int, default=3600,
+                            help='Leave files younger than this alone, so uploads in progress are not collected')
+        parser.add_argument('--unreferenced', action='store_true',
+                            help='First delete media files that no FileField or profile thumbnail refers to')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted without deleting')
+
+    def handle(self, *args, **options):
+        storage = storages['default']
+        if not isinstance(storage, ContentAddressedStorage):
+            raise CommandError('The default storage is not ContentAddressedStorage')
+        cutoff = time.time() - options['grace_seconds']
+        dry_run = options['dry_run']
+
+        names = 0
+        if options['unreferenced']:
+            referenced = referenced_names(storage)
+            for directory, dirnames, filenames in os.walk(storage.location):
+                if directory == storage.location:
+                    dirnames[:] = [d for d in dirnames if d != BLOB_DIR]
+                for filename in filenames:
+                    path = os.path.join(directory, filename)
+                    name = os.path.relpath(path, storage.location).replace('\\', '/')
+                    if name not in referenced and os.stat(path).st_mtime < cutoff:
+                        names += 1
+                        if not dry_run:
+                            os.unlink(path)
+
+        blobs = freed = 0
+        for path, stat in list(storage.iter_blobs()) + list(storage.iter_temporary_files()):
+            # A blob's only remaining link is the blob itself.
+            if stat.st_nlink <= 1 and stat.st_mtime < cutoff:
+                blobs += 1
+                freed += stat.st_size
+                if not dry_run:
+                    os.unlink(path)
+
+        verb = 'Would delete' if dry_run else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {names} unreferenced files and {blobs} orphaned blobs ({freed / 1024 / 1024:.1f} MB)'
+        ))
@@ -0,0 +1,19 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from bookshelf.photos import process_profile_photo
+
+
+class Command(BaseCommand):
+    help = 'Process profile photos that have not been resized and thumbnailed yet (see bookshelf/photos.py).'
+
+    def handle(self, *args, **options):
+        users = (
+            get_user_model().objects.exclude(profile_photo='').exclude(profile_photo__isnull=True)
+            .only('profile_photo', 'profile_thumbnails')
+        )
+        processed = 0
+        for user in users.iterator(chunk_size=500):
+            if user.profile_photo_pending and process_profile_photo(user.pk, user.profile_photo.name) is not None:
+                processed += 1
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} profile photos'))
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:00
+
+from django.db import migrations
+
+FORWARD_SQL = [
+    """
+    CREATE VIRTUAL TABLE bookshelf_book_fts USING fts5(
+        title, author, content='bookshelf_book', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER bookshelf_book_fts_ai AFTER INSERT ON bookshelf_book BEGIN
+        INSERT INTO bookshelf_book_fts(rowid, title, author)
+        VALUES (new.id, new.title, new.author);
+    END
+    """,
+    """
+    CREATE TRIGGER bookshelf_book_fts_ad AFTER DELETE ON bookshelf_book BEGIN
+        INSERT INTO bookshelf_book_fts(bookshelf_book_fts, rowid, title, author)
+        VALUES ('delete', old.id, old.title, old.author);
+    END
+    """,
+    """
+    CREATE TRIGGER bookshelf_book_fts_au AFTER UPDATE ON bookshelf_book BEGIN
+        INSERT INTO bookshelf_book_fts(bookshelf_book_fts, rowid, title, author)
+        VALUES ('delete', old.id, old.title, old.author);
+        INSERT INTO bookshelf_book_fts(rowid, title, author)
+        VALUES (new.id, new.title, new.author);
+    END
+    """,
+    # Index the rows that already exist.
+    "INSERT INTO bookshelf_book_fts(bookshelf_book_fts) VALUES ('rebuild')",
+]
+
+REVERSE_SQL = [
+    'DROP TRIGGER IF EXISTS bookshelf_book_fts_au',
+    'DROP TRIGGER IF EXISTS bookshelf_book_fts_ad',
+    'DROP TRIGGER IF EXISTS bookshelf_book_fts_ai',
+    'DROP TABLE IF EXISTS bookshelf_book_fts',
+]
+
+
+def run_sql(statements):
+    def operation(apps, schema_editor):
+        # FTS5 is SQLite-only; other backends fall back to LIKE searches.
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookshelf', '0002_book_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sql(FORWARD_SQL), run_sql(REVERSE_SQL)),
+    ]
@@ -1,7 +1,20 @@
 from django.db import models
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 
 
+def _setup_django_worker():
+    """
+    Process pool initializer: make sure Django is configured in workers that
+    were spawned rather than forked, so make_password can read settings.
+    """
+    import django
+    from django.apps import apps
+    
+    if not apps.ready:
+        django.setup()
+
+
 class CustomUserManager(BaseUserManager):
     """
     Custom user manager for CustomUser model that handles user creation
@@ -21,6 +34,43 @@ class CustomUserManager(BaseUserManager):
         user.save(using=self._db)
         return user
     
+    def bulk_create_users(self, users, batch_size=1000, processes=None):
+        """
+        Create many regular users at once. `users` is an iterable of dicts
+        with 'email', 'password' and any other model fields. Passwords are
+        hashed in a process pool, since hashing is deliberately slow, and
+        rows are inserted with bulk_create. Signals are not sent.
+        Returns the number of users created.
+        """
+        import os
+        from concurrent.futures import ProcessPoolExecutor
+        
+        processes = processes or os.cpu_count() or 1
+        total = 0
+        with ProcessPoolExecutor(max_workers=processes, initializer=_setup_django_worker) as pool:
+            batch = []
+            for data in users:
+                batch.append(data)
+                if len(batch) >= batch_size:
+                    total += self._create_user_batch(batch, pool, processes)
+                    batch = []
+            if batch:
+                total += self._create_user_batch(batch, pool, processes)
+        return total
+    
+    def _create_user_batch(self, batch, pool, processes):
+        chunksize = max(1, len(batch) // (4 * processes))
+        hashes = pool.map(make_password, [data.get('password') for data in batch], chunksize=chunksize)
+        objs = []
+        for data, encoded in zip(batch, hashes):
+            fields = {key: value for key, value in data.items() if key != 'password'}
+            if not fields.get('email'):
+                raise ValueError('The Email field must be set')
+            fields['email'] = self.normalize_email(fields['email'])
+            objs.append(self.model(password=encoded, **fields))
+        self.bulk_create(objs)
+        return len(objs)
+    
     def create_superuser(self, email, password=None, **extra_fields):
         """
         Create and return a superuser with the given email and password.
@@ -48,6 +98,10 @@ class CustomUser(AbstractUser):
         blank=True,
         help_text="User's profile photo"
     )
+    # Filled in by bookshelf/photos.py once profile_photo is processed:
+    # {'source': <processed photo>, 'small': <thumbnail>, ...}, or
+    # {'failed': <upload>} if the upload could not be processed.
+    profile_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
     
     # Use email as the unique identifier for authentication
     USERNAME_FIELD = 'email'
@@ -62,6 +116,33 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.email})"
     
+    @property
+    def profile_photo_pending(self):
+        """True while an uploaded photo is waiting to be processed."""
+        return (
+            bool(self.profile_photo)
+            and self.profile_photo.name != self.profile_thumbnails.get('source')
+            and not self.profile_photo_failed
+        )
+    
+    @property
+    def profile_photo_failed(self):
+        """True if the uploaded photo could not be processed (e.g. not an image)."""
+        return bool(self.profile_photo) and self.profile_photo.name == self.profile_thumbnails.get('failed')
+    
+    @property
+    def thumbnail_urls(self):
+        """
+        URLs of the processed thumbnails by size label, e.g.
+        {{ user.thumbnail_urls.small }} in templates. Empty until processed.
+        """
+        if not self.profile_photo or self.profile_photo.name != self.profile_thumbnails.get('source'):
+            return {}
+        storage = self._meta.get_field('profile_photo').storage
+        return {
+            label: storage.url(name) for label, name in self.profile_thumbnails.items() if label != 'source'
+        }
+    
     @property
     def age(self):
         """Calculate and return user's age based on date_of_birth."""
@@ -74,14 +155,56 @@ class CustomUser(AbstractUser):
         return None
 
 
+class BookQuerySet(models.QuerySet):
+    """
+    QuerySet for Book with full-text search over title and author.
+    """
+    
+    def search(self, text):
+        """
+        Return the books matching every word of `text`, best matches first.
+        Uses the SQLite FTS5 index when it exists and falls back to
+        case-insensitive LIKE filters otherwise.
+        """
+        from .search import FTS_TABLE, build_match_query, fts_available, search_words
+        
+        words = search_words(text)
+        if not words:
+            return self.none()
+        
+        if not fts_available(self.db):
+            qs = self
+            for word in words:
+                qs = qs.filter(models.Q(title__icontains=word) | models.Q(author__icontains=word))
+            return qs
+        
+        match = build_match_query(words)
+        table = self.model._meta.db_table
+        # Joined rather than filtered with a subquery, so MATCH runs once
+        # and bm25() (lower for better matches) comes from the same scan.
+        return self.extra(
+            select={'search_rank': f'bm25({FTS_TABLE})'},
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = {table}.id', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+        ).order_by('search_rank', 'title')
+
+
 # Keep your existing Book model
 class Book(models.Model):
     title = models.CharField(max_length=200)
     author = models.CharField(max_length=100)
     publication_year = models.IntegerField()
     
+    objects = BookQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.title} by {self.author}"
     
     class Meta:
-        ordering = ['title']
\ No newline at end of file
+        ordering = ['title']
+        indexes = [
+            # Admin list_filter on publication_year, ordered by title
+            models.Index(fields=['publication_year', 'title'], name='shelf_book_year_title_idx'),
+            models.Index(fields=['author'], name='shelf_book_author_idx'),
+        ]
\ No newline at end of file
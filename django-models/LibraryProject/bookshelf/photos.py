@@ -0,0 +1,161 @@
+"""
+Profile photo pipeline for CustomUser.profile_photo.
+
+Uploads are stored as they arrive and processed after the transaction
+commits: the image is rotated according to its EXIF orientation, resized
+to PROFILE_PHOTO_MAX_SIZE and re-encoded without metadata (which removes
+EXIF, including GPS positions), and thumbnails are generated for each
+entry in PROFILE_PHOTO_SIZES. Every output is stored under a name derived
+from the SHA-256 of its content, so identical images share one file and
+URLs can be cached forever. The original upload is deleted afterwards.
+
+PROFILE_PHOTO_QUEUE selects where the work runs:
+  'thread'  (default) a thread pool inside the web process
+  'process' a process pool, for CPU-heavy loads
+  'sync'    inline, for tests and management commands
+"""
+import hashlib
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+PHOTO_DIR = 'profile_photos/processed'
+
+_executor = None
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def encode_image(image, max_size):
+    """
+    Return `image` scaled to fit in max_size x max_size, encoded in
+    PROFILE_PHOTO_FORMAT without any metadata.
+    """
+    from PIL import Image
+
+    image = image.copy()
+    image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, format=_setting('PROFILE_PHOTO_FORMAT', 'WEBP'), quality=_setting('PROFILE_PHOTO_QUALITY', 80))
+    return buffer.getvalue()
+
+
+def save_content_hashed(storage, data):
+    """
+    Store `data` under a name derived from its SHA-256 and return the name.
+    Content that is already stored is not written again.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    extension = _setting('PROFILE_PHOTO_FORMAT', 'WEBP').lower()
+    name = f'{PHOTO_DIR}/{digest[:2]}/{digest}.{extension}'
+    if not storage.exists(name):
+        name = storage.save(name, ContentFile(data))
+    return name
+
+
+def load_image(storage, name):
+    from PIL import Image, ImageOps
+
+    with storage.open(name) as f:
+        image = Image.open(f)
+        # Apply the EXIF orientation, since the metadata is dropped on save.
+        image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+    return image
+
+
+def process_profile_photo(user_id, name):
+    """
+    Process the photo `name` of a user and point the user at the results.
+    Does nothing if the user has uploaded another photo in the meantime.
+    Returns the new profile_thumbnails mapping, or None if skipped or if
+    the photo could not be processed (recorded as {'failed': name}).
+    """
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    user = User.objects.filter(pk=user_id).only('profile_photo').first()
+    if user is None or user.profile_photo.name != name:
+        return None
+    storage = user.profile_photo.storage
+    try:
+        image = load_image(storage, name)
+        photo = save_content_hashed(storage, encode_image(image, _setting('PROFILE_PHOTO_MAX_SIZE', 1024)))
+        thumbnails = {
+            label: save_content_hashed(storage, encode_image(image, size))
+            for label, size in _setting('PROFILE_PHOTO_SIZES', {}).items()
+        }
+    except Exception:
+        # Not an image, truncated, too large, gone...: record the failure so
+        # the upload is not queued again on every save of the user.
+        logger.exception('Could not process profile photo %s of user %s', name, user_id)
+        User.objects.filter(pk=user_id, profile_photo=name).update(profile_thumbnails={'failed': name})
+        return None
+    thumbnails['source'] = photo
+
+    # Conditional on the name, so a newer upload is never overwritten.
+    updated = User.objects.filter(pk=user_id, profile_photo=name).update(
+        profile_photo=photo, profile_thumbnails=thumbnails,
+    )
+    if not updated:
+        return None
+    if photo != name:
+        storage.delete(name)
+    return thumbnails
+
+
+def referenced_photo_names():
+    """
+    Yield the storage names held in CustomUser.profile_thumbnails, which
+    are not FileFields and so are invisible to a scan of file fields.
+    """
+    from django.contrib.auth import get_user_model
+
+    thumbnails = get_user_model().objects.exclude(profile_thumbnails={}).values_list('profile_thumbnails', flat=True)
+    for mapping in thumbnails.iterator(chunk_size=2000):
+        yield from mapping.values()
+
+
+def _run(user_id, name):
+    close_old_connections()
+    try:
+        return process_profile_photo(user_id, name)
+    finally:
+        close_old_connections()
+
+
+def _report_failure(future):
+    exc = future.exception()
+    if exc is not None:
+        logger.error('Profile photo processing failed', exc_info=exc)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        workers = _setting('PROFILE_PHOTO_WORKERS', 2)
+        if _setting('PROFILE_PHOTO_QUEUE', 'thread') == 'process':
+            from .models import _setup_django_worker
+
+            _executor = ProcessPoolExecutor(max_workers=workers, initializer=_setup_django_worker)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='profile-photos')
+    return _executor
+
+
+def enqueue_profile_photo(user_id, name):
+    """
+    Schedule processing of a freshly uploaded photo on PROFILE_PHOTO_QUEUE.
+    """
+    if _setting('PROFILE_PHOTO_QUEUE', 'thread') == 'sync':
+        return process_profile_photo(user_id, name)
+    get_executor().submit(_run, user_id, name).add_done_callback(_report_failure)
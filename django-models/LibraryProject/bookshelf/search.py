@@ -0,0 +1,37 @@
+import re
+
+from django.db import connection
+
+# External-content FTS5 table over bookshelf_book(title, author), kept in
+# sync by the triggers created in migration 0003_book_fts.
+FTS_TABLE = 'bookshelf_book_fts'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_words(text):
+    """
+    Split free text from a search box into words, dropping punctuation.
+    """
+    return _TOKEN_RE.findall(text)
+
+
+def build_match_query(words):
+    """
+    Turn words into an FTS5 MATCH expression: every word must appear, as a
+    prefix, in the title or the author. Quoting each word keeps FTS5
+    operators in user input harmless.
+    """
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def fts_available(using=None):
+    """
+    True when the database is SQLite and the FTS table has been created.
+    """
+    from django.db import connections
+
+    conn = connections[using] if using else connection
+    if conn.vendor != 'sqlite':
+        return False
+    return FTS_TABLE in conn.introspection.table_names()
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .photos import enqueue_profile_photo
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def profile_photo_uploaded(sender, instance, update_fields=None, **kwargs):
+    """
+    Queue a new profile photo for processing once the upload is committed.
+    """
+    if update_fields is not None and 'profile_photo' not in update_fields:
+        # e.g. the last_login update on every login
+        return
+    if instance.profile_photo_pending:
+        transaction.on_commit(lambda: enqueue_profile_photo(instance.pk, instance.profile_photo.name))
@@ -1,3 +1,263 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from .admin_mixins import CachedAllValuesFieldListFilter, EstimatedCountPaginator
+from .models import Book
+
+
+def jpeg_with_exif(size=(800, 600)):
+    image = Image.new('RGB', size, 'red')
+    exif = Image.Exif()
+    exif[0x010F] = 'Test camera'  # Make
+    exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+class BookSearchTests(TestCase):
+    """
+    Book.objects.search() uses the FTS5 index, which the triggers from
+    migration 0003 keep in step with the table.
+    """
+    def setUp(self):
+        self.dune = Book.objects.create(title='Dune', author='Frank Herbert', publication_year=1965)
+        self.history = Book.objects.create(
+            title='A Long History of Deserts, Spice, Sandworms and Dune', author='Various Authors',
+            publication_year=2001,
+        )
+
+    def titles(self, text):
+        return [book.title for book in Book.objects.search(text)]
+
+    def test_best_matches_first(self):
+        self.assertEqual(self.titles('dune'), [self.dune.title, self.history.title])
+        self.assertEqual(self.titles('herb'), ['Dune'])
+        self.assertEqual(self.titles('dune various'), [self.history.title])
+        self.assertEqual(self.titles('"; DROP'), [])
+        self.assertEqual(self.titles('  '), [])
+
+    def test_index_follows_inserts_updates_and_deletes(self):
+        Book.objects.create(title='Kindred', author='Octavia Butler', publication_year=1979)
+        self.assertEqual(self.titles('octavia'), ['Kindred'])
+        self.dune.title = 'Children of Dune'
+        self.dune.save()
+        self.assertEqual(self.titles('children'), ['Children of Dune'])
+        self.history.delete()
+        self.assertEqual(self.titles('dune'), ['Children of Dune'])
+        self.assertEqual(self.titles('sandworms'), [])
+
+    def test_like_fallback_without_fts(self):
+        with mock.patch('bookshelf.search.fts_available', return_value=False):
+            self.assertEqual(self.titles('HERBERT dun'), ['Dune'])
+            self.assertEqual(self.titles('dune'), [self.history.title, 'Dune'])
+
+
+@override_settings(PASSWORD_HASHERS=['bookshelf.hashers.TunedScryptPasswordHasher'])
+class FastChangelistTests(TestCase):
+    """
+    Unfiltered changelists are counted from the planner estimate or a cached
+    count, filtered ones exactly, and value filters are cached.
+    """
+    def setUp(self):
+        cache.clear()
+        for year in (1965, 1969, 1969):
+            Book.objects.create(title=f'Book {year}', author='Le Guin', publication_year=year)
+
+    def count(self, queryset):
+        with CaptureQueriesContext(connection) as captured:
+            count = EstimatedCountPaginator(queryset, 25).count
+        return count, sum('COUNT(' in query['sql'] for query in captured)
+
+    def test_unfiltered_count_uses_planner_estimate(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Book.objects.create(title='Tehanu', author='Le Guin', publication_year=1990)
+        # The estimate is as of ANALYZE, and no COUNT query is run.
+        self.assertEqual(self.count(Book.objects.all()), (3, 0))
+
+    def test_unfiltered_count_cached_without_estimate(self):
+        with mock.patch('bookshelf.admin_mixins.estimate_row_count', return_value=None):
+            self.assertEqual(self.count(Book.objects.all()), (3, 1))
+            Book.objects.create(title='Tehanu', author='Le Guin', publication_year=1990)
+            self.assertEqual(self.count(Book.objects.all()), (3, 0))
+
+    def test_filtered_count_is_exact(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(self.count(Book.objects.filter(publication_year=1969)), (2, 1))
+
+    def test_value_filters_are_cached(self):
+        model_admin = admin.site._registry[Book]
+        request = RequestFactory().get('/admin/bookshelf/book/')
+        self.assertEqual(
+            model_admin.get_list_filter(request),
+            [('publication_year', CachedAllValuesFieldListFilter), ('author', CachedAllValuesFieldListFilter)],
+        )
+        user_admin = admin.site._registry[get_user_model()]
+        self.assertEqual(user_admin.get_list_filter(request), list(user_admin.list_filter))
+
+        def year_filter():
+            field = Book._meta.get_field('publication_year')
+            return CachedAllValuesFieldListFilter(field, request, {}, Book, model_admin, 'publication_year')
+
+        self.assertEqual(year_filter().lookup_choices, [1965, 1969])
+        Book.objects.create(title='Tehanu', author='Le Guin', publication_year=1990)
+        with self.assertNumQueries(0):
+            self.assertEqual(year_filter().lookup_choices, [1965, 1969])
+
+
+class PasswordHasherTests(TestCase):
+    """
+    The tuned hashers take their cost from PASSWORD_HASHER_PARAMS.
+    """
+    def test_scrypt_parameters_from_settings(self):
+        encoded = make_password('secret')
+        with override_settings(PASSWORD_HASHER_PARAMS={'scrypt': {'work_factor': 2 ** 15, 'block_size': 8, 'parallelism': 1}}):
+            # Over OpenSSL's default 32 MiB memory limit.
+            tuned = make_password('secret')
+            self.assertTrue(tuned.startswith('scrypt$32768$'))
+            self.assertTrue(check_password('secret', tuned))
+            self.assertTrue(check_password('secret', encoded))
+            self.assertTrue(get_hasher().must_update(encoded))
+            self.assertFalse(get_hasher().must_update(tuned))
+
+    @override_settings(PASSWORD_HASHER_PARAMS={'scrypt': {'work_factor': 2 ** 10}})
+    def test_bulk_create_users(self):
+        User = get_user_model()
+        created = User.objects.bulk_create_users(
+            ({'email': f'Reader{i}@EXAMPLE.com', 'username': f'reader{i}', 'password': f'pw{i}'} for i in range(5)),
+            batch_size=2, processes=2,
+        )
+        self.assertEqual(created, 5)
+        users = User.objects.order_by('username')
+        self.assertEqual([user.email for user in users], [f'Reader{i}@example.com' for i in range(5)])
+        for i, user in enumerate(users):
+            self.assertTrue(user.password.startswith('scrypt$1024$'))
+            self.assertTrue(user.check_password(f'pw{i}'))
+        with self.assertRaisesMessage(ValueError, 'The Email field must be set'):
+            User.objects.bulk_create_users([{'username': 'nobody', 'password': 'x'}], processes=1)
+
+
+class ProfilePhotoPipelineTests(TestCase):
+    """
+    Uploaded profile photos are resized, thumbnailed and stripped of EXIF
+    after commit, and stored under content-hashed names.
+    """
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root, PROFILE_PHOTO_QUEUE='sync')
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def create_user(self, email):
+        User = get_user_model()
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create_user(
+                email=email, username=email, password='x',
+                profile_photo=SimpleUploadedFile('me.jpg', jpeg_with_exif(), content_type='image/jpeg'),
+            )
+        return User.objects.get(pk=user.pk)
+
+    def test_upload_is_processed(self):
+        user = self.create_user('a@example.com')
+        self.assertFalse(user.profile_photo_pending)
+        self.assertEqual(set(user.thumbnail_urls), {'small', 'medium'})
+        with user.profile_photo.open() as f:
+            image = Image.open(f)
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (600, 800))  # orientation applied
+            self.assertNotIn('exif', image.info)
+        with user.profile_photo.storage.open(user.profile_thumbnails['small']) as f:
+            self.assertEqual(max(Image.open(f).size), 64)
+
+    def test_identical_uploads_share_files(self):
+        first = self.create_user('a@example.com')
+        second = self.create_user('b@example.com')
+        self.assertEqual(first.profile_thumbnails, second.profile_thumbnails)
+
+    def test_unusable_upload_is_not_retried(self):
+        User = get_user_model()
+        with self.assertLogs('bookshelf.photos', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create_user(
+                email='a@example.com', username='a', password='x',
+                profile_photo=SimpleUploadedFile('me.jpg', b'not an image', content_type='image/jpeg'),
+            )
+        user = User.objects.get(pk=user.pk)
+        self.assertTrue(user.profile_photo_failed)
+        self.assertFalse(user.profile_photo_pending)
+        self.assertEqual(user.thumbnail_urls, {})
+        with self.captureOnCommitCallbacks() as callbacks:
+            user.first_name = 'A'
+            user.save()
+        self.assertEqual(callbacks, [])
+
+        # A new upload is processed as usual.
+        with self.captureOnCommitCallbacks(execute=True):
+            user.profile_photo = SimpleUploadedFile('me.jpg', jpeg_with_exif(), content_type='image/jpeg')
+            user.save()
+        user = User.objects.get(pk=user.pk)
+        self.assertFalse(user.profile_photo_failed)
+        self.assertEqual(set(user.thumbnail_urls), {'small', 'medium'})
+
+    def test_command_processes_pending_photos(self):
+        with mock.patch('bookshelf.signals.enqueue_profile_photo'):
+            self.create_user('a@example.com')
+        self.assertTrue(get_user_model().objects.get().profile_photo_pending)
+        out = io.StringIO()
+        call_command('process_profile_photos', stdout=out)
+        self.assertIn('Processed 1 profile photos', out.getvalue())
+        self.assertFalse(get_user_model().objects.get().profile_photo_pending)
+
+
+class ContentAddressedStorageTests(TestCase):
+    """
+    Identical uploads share one blob, which gc_media_blobs removes once no
+    name links to it any more.
+    """
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.storage = storages['default']
+
+    def blobs(self):
+        return list(self.storage.iter_blobs())
+
+    def test_identical_content_is_stored_once(self):
+        first = self.storage.save('avatars/a.png', ContentFile(b'same avatar'))
+        second = self.storage.save('avatars/b.png', ContentFile(b'same avatar'))
+        third = self.storage.save('avatars/a.png', ContentFile(b'other avatar'))
+        self.assertEqual(len({first, second, third}), 3)
+        self.assertTrue(os.path.samefile(self.storage.path(first), self.storage.path(second)))
+        self.assertEqual(len(self.blobs()), 2)
+        with self.storage.open(third) as f:
+            self.assertEqual(f.read(), b'other avatar')
+
+    def test_gc_removes_only_orphaned_blobs(self):
+        kept = self.storage.save('avatars/a.png', ContentFile(b'kept'))
+        dropped = self.storage.save('avatars/b.png', ContentFile(b'dropped'))
+        self.storage.delete(dropped)
+        call_command('gc_media_blobs', grace_seconds=0, stdout=io.StringIO())
+        self.assertEqual(len(self.blobs()), 1)
+        with self.storage.open(kept) as f:
+            self.assertEqual(f.read(), b'kept')
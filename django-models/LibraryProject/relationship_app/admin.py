@@ -1,3 +1,62 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
 
-# Register your models here.
+from bookshelf.admin_mixins import FastChangelistMixin
+from .models import Author, Book, Library, LibraryStats
+
+
+class LibraryActionForm(ActionForm):
+    """
+    Action bar form with a library picker for the membership actions.
+    """
+    library = forms.ModelChoiceField(queryset=Library.objects.order_by('name'), required=False)
+
+
+class BookAdmin(FastChangelistMixin, admin.ModelAdmin):
+    """
+    Admin interface for relationship_app books, with bulk library membership actions.
+    """
+    list_display = ('title', 'author_name')
+    list_select_related = False  # author_name is a column of Book
+    search_fields = ('title',)
+    ordering = ['title']
+    list_per_page = 25
+    action_form = LibraryActionForm
+    actions = ['assign_to_library', 'unassign_from_library']
+
+    def _selected_library(self, request):
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        library = form.cleaned_data.get('library') if form.is_valid() else None
+        if library is None:
+            self.message_user(request, 'Choose a library first.', messages.WARNING)
+        return library
+
+    @admin.action(description='Add selected books to library')
+    def assign_to_library(self, request, queryset):
+        library = self._selected_library(request)
+        if library is not None:
+            book_ids = queryset.values_list('pk', flat=True)
+            Library.objects.bulk_assign([library.pk], book_ids)
+            self.message_user(request, f'Added {len(book_ids)} books to {library}.')
+
+    @admin.action(description='Remove selected books from library')
+    def unassign_from_library(self, request, queryset):
+        library = self._selected_library(request)
+        if library is not None:
+            book_ids = queryset.values_list('pk', flat=True)
+            Library.objects.bulk_unassign([library.pk], book_ids)
+            self.message_user(request, f'Removed {len(book_ids)} books from {library}.')
+
+
+class LibraryAdmin(admin.ModelAdmin):
+    list_display = ('name', 'updated_at')
+    search_fields = ('name',)
+    exclude = ('books',)  # tens of thousands of books: manage them from the Book changelist
+
+
+admin.site.register(Author)
+admin.site.register(Book, BookAdmin)
+admin.site.register(Library, LibraryAdmin)
+admin.site.register(LibraryStats)
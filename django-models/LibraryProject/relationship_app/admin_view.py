@@ -1,8 +1,6 @@
 from django.contrib.auth.decorators import user_passes_test
 from django.shortcuts import render
-
-def is_admin(user):
-    return hasattr(user, 'userprofile') and user.userprofile.role == 'Admin'
+from .roles import is_admin
 
 @user_passes_test(is_admin)
 def admin_view(request):
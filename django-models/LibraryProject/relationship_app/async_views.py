@@ -0,0 +1,124 @@
+"""
+Native async versions of the catalog views, used when the project is served
+over ASGI (settings.ASYNC_CATALOG_VIEWS). Database access goes through the
+async ORM (aget, afirst, async for) so requests do not each hop through a
+sync_to_async thread.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import permission_required
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, redirect, render
+from django.views import View
+
+from .cache import LIBRARY_PAGE_TIMEOUT, aget_library_version, alibrary_page_key, get_cache
+from .conditional import acatalog_validators, library_etag, library_last_modified, not_modified, set_validators
+from .export import CONTENT_TYPES, RENDERERS, arender_catalog
+from .forms import BookForm
+from .models import Book, Library
+from .pagination import DEFAULT_PAGE_SIZE, KeysetPaginator
+
+
+async def list_books(request):
+    """
+    Async counterpart of views.list_books.
+    """
+    etag, last_modified = await acatalog_validators(request)
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        return response
+
+    books = Book.objects.listing()
+    try:
+        paginator = KeysetPaginator(books, request.GET.get('page_size', DEFAULT_PAGE_SIZE))
+        page = await paginator.apage(request.GET.get('cursor'))
+    except ValueError:
+        return HttpResponseBadRequest('Invalid cursor or page size.')
+    response = render(request, 'relationship_app/list_books.html', {'books': page, 'page': page})
+    return set_validators(response, etag, last_modified)
+
+
+@permission_required('relationship_app.view_book')
+async def export_books(request):
+    """
+    Async counterpart of views.export_books. The response streams from an
+    async iterator; a sync one would be read whole before the first byte.
+    """
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in RENDERERS:
+        return HttpResponseBadRequest('Unsupported export format.')
+    response = StreamingHttpResponse(arender_catalog(fmt), content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="catalog.{fmt}"'
+    return response
+
+
+class LibraryDetailView(View):
+    """
+    Async counterpart of views.LibraryDetailView, sharing its page cache.
+    """
+    template_name = 'relationship_app/library_detail.html'
+
+    async def get(self, request, pk):
+        cache = get_cache()
+        version = await aget_library_version(pk)
+        key = await alibrary_page_key(pk, version)
+        etag = library_etag(pk, version)
+        entry = await cache.aget(key)
+        if entry is not None:
+            unchanged = not_modified(request, etag, entry['last_modified'])
+            if unchanged is not None:
+                return unchanged
+            return set_validators(HttpResponse(entry['content']), etag, entry['last_modified'])
+
+        try:
+            library = await Library.objects.select_related('stats').aget(pk=pk)
+        except Library.DoesNotExist:
+            raise Http404('No library found matching the query')
+        books = [
+            book async for book in
+            Book.objects.filter(library=library).listing()
+        ]
+        last_modified = library_last_modified(library, books)
+        unchanged = not_modified(request, etag, last_modified)
+        if unchanged is not None:
+            return unchanged
+        response = render(request, self.template_name, {'library': library, 'books': books})
+        await cache.aset(key, {'content': response.content, 'last_modified': last_modified}, LIBRARY_PAGE_TIMEOUT)
+        return set_validators(response, etag, last_modified)
+
+
+# Form validation and template rendering can query the database (the
+# author choices, a book's author), so those steps run in a worker thread.
+
+@permission_required('relationship_app.can_add_book')
+async def add_book(request):
+    """
+    Allows authorized users to add a new book.
+    """
+    form = BookForm(request.POST or None)
+    if await sync_to_async(form.is_valid)():
+        await sync_to_async(form.save)()
+        return redirect('book-list')
+    return await sync_to_async(render)(request, 'relationship_app/add_book.html', {'form': form})
+
+@permission_required('relationship_app.can_change_book')
+async def edit_book(request, book_id):
+    """
+    Allows authorized users to edit an existing book.
+    """
+    book = await aget_object_or_404(Book, id=book_id)
+    form = BookForm(request.POST or None, instance=book)
+    if await sync_to_async(form.is_valid)():
+        await sync_to_async(form.save)()
+        return redirect('book-list')
+    return await sync_to_async(render)(request, 'relationship_app/edit_book.html', {'form': form, 'book': book})
+
+@permission_required('relationship_app.can_delete_book')
+async def delete_book(request, book_id):
+    """
+    Allows authorized users to delete a book.
+    """
+    book = await aget_object_or_404(Book, id=book_id)
+    if request.method == 'POST':
+        await book.adelete()
+        return redirect('book-list')
+    return await sync_to_async(render)(request, 'relationship_app/delete_book.html', {'book': book})
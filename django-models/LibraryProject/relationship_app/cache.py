@@ -0,0 +1,97 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+LIBRARY_PAGE_CACHE = getattr(settings, 'LIBRARY_PAGE_CACHE', 'default')
+LIBRARY_PAGE_TIMEOUT = getattr(settings, 'LIBRARY_PAGE_TIMEOUT', 600)
+
+
+def get_cache():
+    return caches[LIBRARY_PAGE_CACHE]
+
+
+def _version_key(library_id):
+    return f'library:{library_id}:version'
+
+
+def _initial_version():
+    # Seeded from the clock so a counter that was evicted from the cache
+    # cannot restart at a value whose pages are still stored.
+    return time.time_ns() // 1000
+
+
+def _get_version(key):
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def _aget_version(key):
+    cache = get_cache()
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _initial_version(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def _bump_version(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), timeout=None)
+
+
+def get_library_version(library_id):
+    """
+    Return the current version counter for a library.
+    """
+    return _get_version(_version_key(library_id))
+
+
+async def aget_library_version(library_id):
+    return await _aget_version(_version_key(library_id))
+
+
+def bump_library_versions(library_ids):
+    """
+    Invalidate the cached pages of the given libraries by moving their
+    version counters forward. Old entries are never read again and simply
+    expire.
+    """
+    for library_id in set(library_ids):
+        _bump_version(_version_key(library_id))
+
+
+# Moved forward whenever a book is deleted, which MAX(updated_at) over the
+# remaining books cannot show (see conditional.py).
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def get_catalog_version():
+    return _get_version(CATALOG_VERSION_KEY)
+
+
+async def aget_catalog_version():
+    return await _aget_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    _bump_version(CATALOG_VERSION_KEY)
+
+
+def library_page_key(library_id, version=None):
+    if version is None:
+        version = get_library_version(library_id)
+    return f'library:{library_id}:page:v{version}'
+
+
+async def alibrary_page_key(library_id, version=None):
+    if version is None:
+        version = await aget_library_version(library_id)
+    return f'library:{library_id}:page:v{version}'
@@ -0,0 +1,69 @@
+"""
+ETag / Last-Modified support for the catalog pages, so polling clients get
+a 304 without the page being queried or rendered.
+"""
+import hashlib
+
+from django.db.models import Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .cache import aget_catalog_version, get_catalog_version
+from .models import Book
+
+
+def library_etag(library_id, version):
+    # The page cache version (cache.py) changes on every write that can
+    # alter the page, so it identifies the page content by itself.
+    return quote_etag(f'library-{library_id}-{version}')
+
+
+def library_last_modified(library, books):
+    """
+    Latest change to a library page, from objects already loaded for
+    rendering: the library, its stats row (membership changes) and books.
+    """
+    stamps = [library.updated_at]
+    stats = getattr(library, 'stats', None)
+    if stats is not None:
+        stamps.append(stats.last_changed)
+    stamps.extend(book.updated_at for book in books)
+    return max(stamps)
+
+
+def _catalog_validators(last_modified, version, request):
+    digest = hashlib.md5(
+        f"{last_modified}|{version}|{request.GET.urlencode()}".encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+    return quote_etag(f'books-{digest}'), last_modified
+
+
+def catalog_validators(request):
+    """
+    ETag and Last-Modified for a list_books page: MAX(updated_at), an
+    index lookup, catches additions and edits, the catalog version counter
+    (cache.py) catches deletions, and the query string tells pages apart.
+    """
+    last_modified = Book.objects.aggregate(last_modified=Max('updated_at'))['last_modified']
+    return _catalog_validators(last_modified, get_catalog_version(), request)
+
+
+async def acatalog_validators(request):
+    last_modified = (await Book.objects.aaggregate(last_modified=Max('updated_at')))['last_modified']
+    return _catalog_validators(last_modified, await aget_catalog_version(), request)
+
+
+def not_modified(request, etag, last_modified=None):
+    """
+    Return a 304 response if the client's copy is current, else None.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
@@ -0,0 +1,115 @@
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db.models import Prefetch, prefetch_related_objects
+
+from .models import Book, Library
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FIELDS = ['id', 'title', 'author', 'libraries']
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """
+    File-like object whose write() hands the value back, so csv.writer can
+    be used to produce rows for a StreamingHttpResponse.
+    """
+    def write(self, value):
+        return value
+
+
+def library_catalog_rows(library, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Like catalog_rows, for the books of one library only. The books are
+    walked with Library.iter_book_chunks, so memory stays bounded however
+    large the library is.
+    """
+    for chunk in library.iter_book_chunks(chunk_size):
+        prefetch_related_objects(chunk, Prefetch('library_set', queryset=Library.objects.only('id', 'name')))
+        for book in chunk:
+            yield {
+                'id': book.id,
+                'title': book.title,
+                'author': book.author_name,
+                'libraries': [library.name for library in book.library_set.all()],
+            }
+
+
+def catalog_rows(chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield one dict per book with its author and the names of the libraries
+    holding it. Books are fetched chunk by chunk with .iterator(), and the
+    library prefetch runs once per chunk, so memory stays bounded.
+    """
+    books = (
+        Book.objects.only('id', 'title', 'author_name')
+        .prefetch_related(Prefetch('library_set', queryset=Library.objects.only('id', 'name')))
+        .order_by('id')
+        .iterator(chunk_size=chunk_size)
+    )
+    for book in books:
+        yield {
+            'id': book.id,
+            'title': book.title,
+            'author': book.author_name,
+            'libraries': [library.name for library in book.library_set.all()],
+        }
+
+
+def render_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([row['id'], row['title'], row['author'], '|'.join(row['libraries'])])
+
+
+def render_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row) + '\n'
+
+
+RENDERERS = {
+    'csv': render_csv,
+    'jsonl': render_jsonl,
+}
+
+
+def render_catalog(fmt, chunk_size=EXPORT_CHUNK_SIZE, library=None):
+    """
+    Return a generator of text chunks for the whole catalog in `fmt`, or
+    for the books of `library` only.
+    """
+    if library is not None:
+        return RENDERERS[fmt](library_catalog_rows(library, chunk_size))
+    return RENDERERS[fmt](catalog_rows(chunk_size))
+
+
+def _next_piece(chunks, size):
+    return ''.join(islice(chunks, size))
+
+
+async def arender_catalog(fmt, chunk_size=EXPORT_CHUNK_SIZE, library=None):
+    """
+    Async counterpart of render_catalog, for StreamingHttpResponse under
+    ASGI. Given a sync generator, Django would read it to the end before
+    sending the first byte. Here each chunk_size rows are rendered in the
+    sync thread and sent as one piece, so memory stays bounded as in
+    render_catalog.
+    """
+    chunks = render_catalog(fmt, chunk_size, library)
+    next_piece = sync_to_async(_next_piece)
+    try:
+        while True:
+            piece = await next_piece(chunks, chunk_size)
+            if not piece:
+                return
+            yield piece
+    finally:
+        # Close the database cursor if the client went away mid-stream.
+        await sync_to_async(chunks.close)()
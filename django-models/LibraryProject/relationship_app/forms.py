@@ -0,0 +1,12 @@
+from django import forms
+
+from .models import Book
+
+
+class BookForm(forms.ModelForm):
+    """
+    Form used by the add_book and edit_book views.
+    """
+    class Meta:
+        model = Book
+        fields = ['title', 'author']
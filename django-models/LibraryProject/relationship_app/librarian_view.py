@@ -1,8 +1,6 @@
 from django.contrib.auth.decorators import user_passes_test
 from django.shortcuts import render
-
-def is_librarian(user):
-    return hasattr(user, 'userprofile') and user.userprofile.role == 'Librarian'
+from .roles import is_librarian
 
 @user_passes_test(is_librarian)
 def librarian_view(request):
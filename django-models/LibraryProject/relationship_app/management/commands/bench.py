@@ -0,0 +1,73 @@
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.suite import DEFAULT_SIZES, IMPORT_ROWS, over_budget, regressions, run_size
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the performance regression suite (benchmarks/suite.py) against fresh test databases '
+        'and write the results as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                            help='Catalog sizes (books) to seed, e.g. --sizes 1000 100000 1000000')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case')
+        parser.add_argument('--import-rows', type=int, default=IMPORT_ROWS, help='Rows loaded by the bulk import case')
+        parser.add_argument('--output', default='bench-results.json', help='Where to write the JSON results')
+        parser.add_argument('--compare', help='Earlier results file to compare median timings against')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Slowdown, as a fraction, reported as a regression by --compare')
+
+    def handle(self, *args, **options):
+        results = {}
+        for size in options['sizes']:
+            self.stdout.write(f'Seeding {size} books...')
+            results[str(size)] = cases = run_size(size, options['repeat'], options['import_rows'])
+            for name, case in cases.items():
+                queries = f"{case['queries']}/{case['budget']} queries" if case.get('budget') is not None else ''
+                self.stdout.write(f"  {name:<42} {case['median_ms']:>10.3f} ms  {queries}")
+
+        with open(options['output'], 'w') as f:
+            json.dump({
+                'meta': {
+                    'commit': current_commit(),
+                    'created': datetime.now(timezone.utc).isoformat(),
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'repeat': options['repeat'],
+                },
+                'results': results,
+            }, f, indent=2)
+        self.stdout.write(f"Wrote {options['output']}")
+
+        failures = [
+            f'{name} at {size} books ran {queries} queries (budget {budget})'
+            for size, name, queries, budget in over_budget(results)
+        ]
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)['results']
+            for size, name, before, after in regressions(results, baseline, options['tolerance']):
+                self.stdout.write(self.style.WARNING(
+                    f'{name} at {size} books: {before:.3f} ms -> {after:.3f} ms'
+                ))
+        if failures:
+            raise CommandError('Query budget exceeded:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('All cases within their query budgets'))
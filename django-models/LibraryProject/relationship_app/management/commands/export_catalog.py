@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from relationship_app.export import EXPORT_CHUNK_SIZE, RENDERERS, render_catalog
+from relationship_app.models import Library
+
+
+class Command(BaseCommand):
+    help = 'Stream the book catalog, with library membership, as CSV or JSONL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(RENDERERS), default='jsonl', help='Output format')
+        parser.add_argument('--output', '-o', help='File to write to; defaults to stdout')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help='Rows fetched per database round trip')
+        parser.add_argument('--library', type=int, help='Only export the books of the library with this id')
+
+    def handle(self, *args, **options):
+        library = None
+        if options['library'] is not None:
+            try:
+                library = Library.objects.get(pk=options['library'])
+            except Library.DoesNotExist:
+                raise CommandError(f"Library {options['library']} does not exist")
+        chunks = render_catalog(options['format'], options['chunk_size'], library)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+                f.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
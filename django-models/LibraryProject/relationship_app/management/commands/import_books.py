@@ -0,0 +1,166 @@
+import csv
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from bookshelf.models import Book as ShelfBook
+from relationship_app.models import Author, Book
+
+
+# Fields each --target needs; every record must have them, non-empty.
+REQUIRED_FIELDS = {
+    'relationship_app': ('title', 'author'),
+    'bookshelf': ('title', 'author', 'publication_year'),
+}
+
+
+def clean_record(record, fields):
+    """
+    Return the `fields` of a parsed record, stripped, with
+    publication_year as an int. Raises ValueError if one is missing or
+    invalid.
+    """
+    if not isinstance(record, dict):
+        raise ValueError('expected an object')
+    cleaned = {}
+    for field in fields:
+        value = record.get(field)
+        value = '' if value is None else str(value).strip()
+        if not value:
+            raise ValueError(f'missing {field}')
+        cleaned[field] = value
+    if 'publication_year' in cleaned:
+        try:
+            cleaned['publication_year'] = int(cleaned['publication_year'])
+        except ValueError:
+            raise ValueError(f"invalid publication_year {cleaned['publication_year']!r}") from None
+    return cleaned
+
+
+def read_records(path, fmt, offset=0, fields=REQUIRED_FIELDS['relationship_app']):
+    """
+    Stream records from a CSV or JSONL file, one per line, starting at a
+    byte offset. Yields (record, offset_after_record) so a caller can
+    resume exactly where it stopped. CSV files must have a header row and
+    may not contain line breaks inside fields. Each record is checked with
+    clean_record(record, fields).
+    """
+    with open(path, 'rb') as f:
+        header = None
+        if fmt == 'csv':
+            first = f.readline()
+            header = next(csv.reader([first.decode('utf-8-sig')]))
+            offset = max(offset, len(first))
+        f.seek(offset)
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            start, offset = offset, offset + len(line)
+            try:
+                text = line.decode('utf-8').strip()
+                if not text:
+                    continue
+                if fmt == 'csv':
+                    record = dict(zip(header, next(csv.reader([text]))))
+                else:
+                    record = json.loads(text)
+                record = clean_record(record, fields)
+            except ValueError as exc:
+                raise CommandError(f'Malformed record at byte {start}: {exc}') from exc
+            yield record, offset
+
+
+def batched(records, size):
+    batch = []
+    for item in records:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Bulk import books (and their authors) from a CSV or JSONL file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with header) or JSONL file with title, author and, for bookshelf, publication_year')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Input format; guessed from the file extension by default')
+        parser.add_argument('--target', choices=['relationship_app', 'bookshelf'], default='relationship_app',
+                            help='Which Book model to load into')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create and per transaction')
+        parser.add_argument('--offset', type=int, default=0, help='Byte offset to resume from (printed after every batch)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive')
+
+        load_batch = self.load_shelf_batch if options['target'] == 'bookshelf' else self.load_relationship_batch
+        self.author_ids = {}
+
+        total = 0
+        offset = options['offset']
+        started = time.monotonic()
+        rows = read_records(path, fmt, offset, REQUIRED_FIELDS[options['target']])
+        for batch in batched(rows, batch_size):
+            records = [record for record, _ in batch]
+            with transaction.atomic():
+                load_batch(records, batch_size)
+            total += len(records)
+            offset = batch[-1][1]
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'{total} rows, {total / elapsed if elapsed else 0:.0f} rows/sec, resume with --offset {offset}'
+            )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {total} books in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} rows/sec)'
+        ))
+
+    def resolve_authors(self, names):
+        """
+        Map author names to ids, creating the missing ones with a single
+        bulk_create. Known names are served from self.author_ids.
+        """
+        missing = {name for name in names if name not in self.author_ids}
+        if not missing:
+            return
+        self.author_ids.update(Author.objects.filter(name__in=missing).values_list('name', 'id'))
+        missing -= self.author_ids.keys()
+        if missing:
+            Author.objects.bulk_create([Author(name=name) for name in missing], ignore_conflicts=True)
+            self.author_ids.update(Author.objects.filter(name__in=missing).values_list('name', 'id'))
+
+    def load_relationship_batch(self, records, batch_size):
+        self.resolve_authors({record['author'] for record in records})
+        Book.objects.bulk_create(
+            [
+                Book(title=record['title'], author_id=self.author_ids[record['author']], author_name=record['author'])
+                for record in records
+            ],
+            batch_size=batch_size,
+        )
+
+    def load_shelf_batch(self, records, batch_size):
+        ShelfBook.objects.bulk_create(
+            [
+                ShelfBook(
+                    title=record['title'],
+                    author=record['author'],
+                    publication_year=record['publication_year'],
+                )
+                for record in records
+            ],
+            batch_size=batch_size,
+        )
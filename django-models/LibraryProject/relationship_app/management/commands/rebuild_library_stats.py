@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from relationship_app.stats import compute_library_stats, save_library_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute LibraryStats for every library (or the given ids) from the actual memberships.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('library_ids', nargs='*', type=int, help='Only rebuild these libraries')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        library_ids = options['library_ids'] or None
+        batch_size = options['batch_size']
+        total = 0
+        batch = []
+        for row in compute_library_stats(library_ids):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                with transaction.atomic():
+                    save_library_stats(batch, batch_size)
+                total += len(batch)
+                batch = []
+        if batch:
+            with transaction.atomic():
+                save_library_stats(batch, batch_size)
+            total += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {total} libraries'))
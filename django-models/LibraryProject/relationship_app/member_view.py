@@ -1,8 +1,6 @@
 from django.contrib.auth.decorators import user_passes_test
 from django.shortcuts import render
-
-def is_member(user):
-    return hasattr(user, 'userprofile') and user.userprofile.role == 'Member'
+from .roles import is_member
 
 @user_passes_test(is_member)
 def member_view(request):
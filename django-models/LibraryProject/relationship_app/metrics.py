@@ -0,0 +1,207 @@
+"""
+Per-view query and latency metrics, collected by QueryMetricsMiddleware and
+served in the Prometheus text format by metrics_view.
+
+Every database connection gets the record_query execute wrapper when it is
+opened. The wrapper reports to the QueryStats of the current request, found
+through a context variable, so queries run by async views through
+sync_to_async are attributed to the right request too.
+
+Metrics are kept per process: with several gunicorn workers each one
+reports its own counters, which Prometheus sums over the scraped targets.
+"""
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Duplicate query signatures kept per view, so a view that builds many
+# different queries cannot grow the registry without bound.
+MAX_SIGNATURES_PER_VIEW = 20
+MAX_SIGNATURE_LENGTH = 200
+
+_current = ContextVar('query_stats', default=None)
+
+
+class QueryStats:
+    """
+    The queries of one request.
+    """
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.signatures = Counter()
+
+    def duplicates(self):
+        """
+        Return {sql: extra executions} for statements run more than once,
+        the usual sign of an N+1 pattern.
+        """
+        return {sql: count - 1 for sql, count in self.signatures.items() if count > 1}
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.seconds += time.perf_counter() - started
+        # Parameters are left out, so one query per row has one signature.
+        stats.signatures[sql] += 1
+
+
+def install_query_recorder(connection, **kwargs):
+    """
+    connection_created receiver that adds record_query to a connection.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def start_recording():
+    """
+    Start collecting the queries of the current request; pass the returned
+    token to stop_recording.
+    """
+    stats = QueryStats()
+    return stats, _current.set(stats)
+
+
+def stop_recording(token):
+    _current.reset(token)
+
+
+class ViewMetrics:
+    """
+    Counters and latency histograms per view, safe to update from several
+    threads.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def _empty(self):
+        return {
+            'requests': 0,
+            'queries': 0,
+            'sql_seconds': 0.0,
+            'duplicate_queries': 0,
+            'latency_buckets': [0] * len(LATENCY_BUCKETS),
+            'latency_sum': 0.0,
+            'signatures': Counter(),
+        }
+
+    def observe(self, view, latency, stats):
+        duplicates = stats.duplicates()
+        with self._lock:
+            entry = self._views.setdefault(view, self._empty())
+            entry['requests'] += 1
+            entry['queries'] += stats.count
+            entry['sql_seconds'] += stats.seconds
+            entry['duplicate_queries'] += sum(duplicates.values())
+            entry['latency_sum'] += latency
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    entry['latency_buckets'][i] += 1
+            signatures = entry['signatures']
+            for sql, count in duplicates.items():
+                sql = sql[:MAX_SIGNATURE_LENGTH]
+                if sql in signatures or len(signatures) < MAX_SIGNATURES_PER_VIEW:
+                    signatures[sql] += count
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view: {**entry, 'latency_buckets': list(entry['latency_buckets']), 'signatures': Counter(entry['signatures'])}
+                for view, entry in self._views.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = ViewMetrics()
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def render_prometheus(snapshot):
+    """
+    Format a ViewMetrics snapshot in the Prometheus text exposition format.
+    """
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(samples)
+
+    views = sorted(snapshot)
+    family('django_view_requests_total', 'counter', 'Requests handled, by view.', [
+        f'django_view_requests_total{{view="{_label(view)}"}} {snapshot[view]["requests"]}' for view in views
+    ])
+    family('django_view_queries_total', 'counter', 'SQL queries executed, by view.', [
+        f'django_view_queries_total{{view="{_label(view)}"}} {snapshot[view]["queries"]}' for view in views
+    ])
+    family('django_view_sql_seconds_total', 'counter', 'Time spent executing SQL, by view.', [
+        f'django_view_sql_seconds_total{{view="{_label(view)}"}} {snapshot[view]["sql_seconds"]:.6f}' for view in views
+    ])
+    family('django_view_duplicate_queries_total', 'counter',
+           'Queries repeating an earlier statement of the same request (N+1), by view.', [
+               f'django_view_duplicate_queries_total{{view="{_label(view)}"}} {snapshot[view]["duplicate_queries"]}'
+               for view in views
+           ])
+    family('django_view_duplicate_query_signature_total', 'counter',
+           'Repeated executions of each duplicated statement, by view.', [
+               f'django_view_duplicate_query_signature_total{{view="{_label(view)}",sql="{_label(sql)}"}} {count}'
+               for view in views for sql, count in snapshot[view]['signatures'].most_common()
+           ])
+
+    samples = []
+    for view in views:
+        entry = snapshot[view]
+        label = _label(view)
+        for bound, count in zip(LATENCY_BUCKETS, entry['latency_buckets']):
+            samples.append(f'django_view_latency_seconds_bucket{{view="{label}",le="{bound}"}} {count}')
+        samples.append(f'django_view_latency_seconds_bucket{{view="{label}",le="+Inf"}} {entry["requests"]}')
+        samples.append(f'django_view_latency_seconds_sum{{view="{label}"}} {entry["latency_sum"]:.6f}')
+        samples.append(f'django_view_latency_seconds_count{{view="{label}"}} {entry["requests"]}')
+    family('django_view_latency_seconds', 'histogram', 'Response time, by view.', samples)
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_allowed(request):
+    """
+    True for requests bearing settings.METRICS_TOKEN or coming from an
+    address in settings.METRICS_ALLOWED_IPS. Both are unset by default, so
+    the metrics are private unless configured.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', [])
+
+
+def metrics_view(request):
+    """
+    Serve the metrics of this process to Prometheus, if metrics_allowed().
+    """
+    if not metrics_allowed(request):
+        return HttpResponseForbidden('Forbidden')
+    return HttpResponse(
+        render_prometheus(registry.snapshot()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,120 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .metrics import install_query_recorder, registry, start_recording, stop_recording
+from .roles import aget_user_role, get_user_role
+from .routers import replica_enabled, start_request, wrote_to_primary
+
+REPLICA_PIN_COOKIE = 'pin_primary'
+REPLICA_PIN_SECONDS = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+
+class UserRoleMiddleware:
+    """
+    Resolves the role of the logged-in user once per request and stores it
+    on request.user, so the is_admin/is_librarian/is_member checks do not
+    query UserProfile again. Must come after AuthenticationMiddleware.
+    Runs natively under both WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        user = getattr(request, 'user', None)
+        if user is not None:
+            get_user_role(user)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if hasattr(request, 'auser'):
+            # request.auser() and the lazy request.user load separate user
+            # objects; use the loaded one as request.user so the role is
+            # cached on the object the role checks receive.
+            request.user = await request.auser()
+            await aget_user_role(request.user)
+        return await self.get_response(request)
+
+
+class ReplicaPinningMiddleware:
+    """
+    Keeps a client on the primary database for REPLICA_PIN_SECONDS after it
+    writes, so that e.g. add_book's redirect to book-list already shows the
+    new book even if the replica lags behind. See routers.py.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start_request(pinned=REPLICA_PIN_COOKIE in request.COOKIES)
+        return self.process_response(self.get_response(request))
+
+    async def __acall__(self, request):
+        start_request(pinned=REPLICA_PIN_COOKIE in request.COOKIES)
+        return self.process_response(await self.get_response(request))
+
+    def process_response(self, response):
+        if replica_enabled() and wrote_to_primary():
+            response.set_cookie(REPLICA_PIN_COOKIE, '1', max_age=REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
+        return response
+
+
+class QueryMetricsMiddleware:
+    """
+    Records the query count, SQL time, duplicated queries and latency of
+    every request under its URL name (book-list, library-detail, ...), for
+    the /metrics endpoint (see metrics.py). Put it near the top of
+    MIDDLEWARE so session and authentication queries are counted too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(install_query_recorder, dispatch_uid='relationship_app.query_metrics')
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token = start_recording()
+        started = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            stop_recording(token)
+            registry.observe(self.view_name(request), time.perf_counter() - started, stats)
+
+    async def __acall__(self, request):
+        stats, token = start_recording()
+        started = time.perf_counter()
+        try:
+            return await self.get_response(request)
+        finally:
+            stop_recording(token)
+            registry.observe(self.view_name(request), time.perf_counter() - started, stats)
+
+    @staticmethod
+    def view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match is not None else 'unresolved'
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:00
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def duplicate_names(model):
+    return (
+        model.objects.values('name').annotate(copies=Count('id'))
+        .filter(copies__gt=1).values_list('name', flat=True)
+    )
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """
+    Author.name and Library.name become unique below. Merge rows sharing a
+    name into the oldest one first, moving their books, memberships and
+    librarian over, so the unique index can be built on existing data.
+    """
+    Author = apps.get_model('relationship_app', 'Author')
+    Book = apps.get_model('relationship_app', 'Book')
+    Library = apps.get_model('relationship_app', 'Library')
+    Librarian = apps.get_model('relationship_app', 'Librarian')
+    Membership = Library.books.through
+
+    for name in list(duplicate_names(Author)):
+        keep, *others = Author.objects.filter(name=name).order_by('pk').values_list('pk', flat=True)
+        Book.objects.filter(author_id__in=others).update(author_id=keep)
+        Author.objects.filter(pk__in=others).delete()
+
+    for name in list(duplicate_names(Library)):
+        keep, *others = Library.objects.filter(name=name).order_by('pk').values_list('pk', flat=True)
+        librarians = Librarian.objects.filter(library_id__in=[keep, *others])
+        if librarians.count() > 1:
+            raise RuntimeError(
+                f'Libraries named {name!r} have {librarians.count()} librarians between them, and a '
+                f'library can only have one. Rename the libraries or reassign the librarians, then migrate again.'
+            )
+        librarians.update(library_id=keep)
+        held = set(Membership.objects.filter(library_id=keep).values_list('book_id', flat=True))
+        moved = set(Membership.objects.filter(library_id__in=others).values_list('book_id', flat=True)) - held
+        Membership.objects.bulk_create([Membership(library_id=keep, book_id=book_id) for book_id in moved])
+        Library.objects.filter(pk__in=others).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('relationship_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='author',
+            name='name',
+            field=models.CharField(max_length=200, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='library',
+            name='name',
+            field=models.CharField(max_length=200, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['author', 'title'], name='book_author_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['title', 'id'], name='book_title_id_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_stats(apps, schema_editor):
+    Library = apps.get_model('relationship_app', 'Library')
+    LibraryStats = apps.get_model('relationship_app', 'LibraryStats')
+    now = django.utils.timezone.now()
+    rows = Library.objects.annotate(
+        n_books=models.Count('books', distinct=True),
+        n_authors=models.Count('books__author', distinct=True),
+    ).values_list('pk', 'n_books', 'n_authors')
+    LibraryStats.objects.bulk_create(
+        [
+            LibraryStats(library_id=pk, book_count=n_books, author_count=n_authors, last_changed=now)
+            for pk, n_books, n_authors in rows.iterator(chunk_size=500)
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('relationship_app', '0002_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LibraryStats',
+            fields=[
+                ('library', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='relationship_app.library')),
+                ('book_count', models.PositiveIntegerField(default=0)),
+                ('author_count', models.PositiveIntegerField(default=0)),
+                ('last_changed', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'Library stats',
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
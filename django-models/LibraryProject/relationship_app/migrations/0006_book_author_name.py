@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:00
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_author_names(apps, schema_editor):
+    Author = apps.get_model('relationship_app', 'Author')
+    Book = apps.get_model('relationship_app', 'Book')
+    Book.objects.update(
+        author_name=Subquery(Author.objects.filter(pk=OuterRef('author_id')).values('name')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('relationship_app', '0005_catalog_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='author_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(copy_author_names, migrations.RunPython.noop),
+    ]
@@ -1,134 +1,255 @@
-from django.db import models
-from django.contrib.auth.models import AbstractUser, BaseUserManager
-from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.query import ValuesListIterable
+from django.dispatch import Signal
+from django.utils import timezone
 
-# Custom User Manager
-class CustomUserManager(BaseUserManager):
-    """
-    Custom user manager that handles user creation with additional fields
-    """
-    def create_user(self, username, email=None, password=None, **extra_fields):
-        """
-        Create and return a regular user with the given username, email, and password.
-        """
-        if not username:
-            raise ValueError('The Username field must be set')
-        
-        # Normalize email if provided
-        if email:
-            email = self.normalize_email(email)
-        
-        # Set default values for extra fields
-        extra_fields.setdefault('is_staff', False)
-        extra_fields.setdefault('is_superuser', False)
-        
-        # Create user instance
-        user = self.model(username=username, email=email, **extra_fields)
-        user.set_password(password)
-        user.save(using=self._db)
-        return user
-    
-    def create_superuser(self, username, email=None, password=None, **extra_fields):
-        """
-        Create and return a superuser with the given username, email, and password.
-        """
-        # Set required superuser fields
-        extra_fields.setdefault('is_staff', True)
-        extra_fields.setdefault('is_superuser', True)
-        
-        if extra_fields.get('is_staff') is not True:
-            raise ValueError('Superuser must have is_staff=True.')
-        if extra_fields.get('is_superuser') is not True:
-            raise ValueError('Superuser must have is_superuser=True.')
-        
-        # Create superuser
-        return self.create_user(username, email, password, **extra_fields)
-
-# Custom User Model
-class CustomUser(AbstractUser):
+# Update existing models to use the custom user model
+class Author(models.Model):
+    name = models.CharField(max_length=200, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+# The columns list_books and library_detail.html render; loading only these
+# skips the author join.
+BOOK_LIST_FIELDS = ('id', 'title', 'author_name', 'updated_at')
+
+
+class BookRow:
     """
-    Custom user model extending AbstractUser with additional fields
+    Read-only row returned by Book.objects.listing(): the BOOK_LIST_FIELDS
+    of one book, without the per-instance state of a model object.
     """
-    # Additional fields
-    date_of_birth = models.DateField(
-        null=True, 
-        blank=True, 
-        help_text="User's date of birth"
-    )
-    profile_photo = models.ImageField(
-        upload_to='profile_photos/',
-        null=True,
-        blank=True,
-        help_text="User's profile photo"
-    )
-    
-    # Role choices for user roles
-    ROLE_CHOICES = [
-        ('Admin', 'Admin'),
-        ('Librarian', 'Librarian'),
-        ('Member', 'Member'),
-    ]
+    __slots__ = BOOK_LIST_FIELDS
     
-    role = models.CharField(
-        max_length=20,
-        choices=ROLE_CHOICES,
-        default='Member',
-        help_text="User's role in the system"
-    )
+    def __init__(self, id, title, author_name, updated_at):
+        self.id = id
+        self.title = title
+        self.author_name = author_name
+        self.updated_at = updated_at
     
-    # Use custom manager
-    objects = CustomUserManager()
-    
-    class Meta:
-        verbose_name = 'User'
-        verbose_name_plural = 'Users'
+    @property
+    def pk(self):
+        return self.id
     
     def __str__(self):
-        return f"{self.username} ({self.role})"
+        return self.title
     
-    @property
-    def age(self):
-        """Calculate user's age from date of birth"""
-        if self.date_of_birth:
-            from datetime import date
-            today = date.today()
-            return today.year - self.date_of_birth.year - ((today.month, today.day) < (self.date_of_birth.month, self.date_of_birth.day))
-        return None
+    def __repr__(self):
+        return f'<BookRow {self.id}: {self.title}>'
 
-# Update existing models to use the custom user model
-class Author(models.Model):
-    name = models.CharField(max_length=200)
 
-    def __str__(self):
-        return self.name
+class BookRowIterable(ValuesListIterable):
+    def __iter__(self):
+        for row in super().__iter__():
+            yield BookRow(*row)
+
+
+class BookQuerySet(models.QuerySet):
+    """
+    QuerySet for Book with a fast path for read-only listings.
+    """
+    
+    def listing(self):
+        """
+        Return BookRow objects built from values_list(*BOOK_LIST_FIELDS)
+        instead of Book instances: no model init, signals or state
+        tracking, and a fraction of the memory. Templates can use them like
+        books (book.pk, book.title, book.author_name, book.updated_at).
+        """
+        clone = self.values_list(*BOOK_LIST_FIELDS)
+        clone._iterable_class = BookRowIterable
+        return clone
+
 
 class Book(models.Model):
     title = models.CharField(max_length=200)
     author = models.ForeignKey(Author, on_delete=models.CASCADE)
+    # Copy of author.name so listings can print it without a join. Set on
+    # save and rewritten by the Author post_save signal (signals.py);
+    # bulk_create() callers must fill it in themselves.
+    author_name = models.CharField(max_length=200, blank=True, default='', editable=False)
+    # Part of the template fragment cache key for the book's list row.
+    # QuerySet.update() does not touch it; set it explicitly there.
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = BookQuerySet.as_manager()
     
     def __str__(self):
         return self.title
     
+    def save(self, *args, update_fields=None, **kwargs):
+        # auto_now only applies to fields being saved, so a partial save
+        # must include updated_at, and author_name along with author, or
+        # the cached fragments and list ETag would go stale.
+        if update_fields:
+            update_fields = {*update_fields, 'updated_at'}
+            if 'author' in update_fields or 'author_id' in update_fields:
+                update_fields.add('author_name')
+        super().save(*args, update_fields=update_fields, **kwargs)
+    
     class Meta:
         permissions = [
             ("can_add_book", "Can add book"),
             ("can_change_book", "Can change book"),
             ("can_delete_book", "Can delete book"),
         ]
+        indexes = [
+            # Books by author, listed by title
+            models.Index(fields=['author', 'title'], name='book_author_title_idx'),
+            # Keyset pagination in list_books orders on (title, id)
+            models.Index(fields=['title', 'id'], name='book_title_id_idx'),
+            # MAX(updated_at) for list_books' Last-Modified/ETag
+            models.Index(fields=['updated_at'], name='book_updated_at_idx'),
+        ]
+
+# Sent once per Library.objects.bulk_assign()/bulk_unassign() call, with
+# action ('assign' or 'unassign'), library_ids and book_ids; the per-row
+# m2m_changed signal is not sent for these.
+library_books_bulk_changed = Signal()
+
+
+class LibraryQuerySet(models.QuerySet):
+    """
+    QuerySet for Library with batched membership changes.
+    """
+    
+    def _membership_batches(self, library_ids, book_ids, batch_size):
+        library_ids = list(library_ids)
+        batch = []
+        for book_id in book_ids:
+            batch.append(book_id)
+            if len(batch) >= batch_size:
+                yield library_ids, batch
+                batch = []
+        if batch:
+            yield library_ids, batch
+    
+    def bulk_assign(self, library_ids, book_ids, batch_size=5000):
+        """
+        Add every book in `book_ids` to every library in `library_ids` with
+        batched INSERTs into the through table. Existing memberships are
+        skipped. Sends library_books_bulk_changed once at the end.
+        """
+        Membership = self.model.books.through
+        library_ids = list(library_ids)
+        book_ids = list(book_ids)
+        with transaction.atomic(using=self.db):
+            for libraries, books in self._membership_batches(library_ids, book_ids, max(1, batch_size // max(1, len(library_ids)))):
+                Membership.objects.using(self.db).bulk_create(
+                    [Membership(library_id=library_id, book_id=book_id) for library_id in libraries for book_id in books],
+                    ignore_conflicts=True,
+                )
+            library_books_bulk_changed.send(
+                sender=self.model, action='assign', library_ids=library_ids, book_ids=book_ids, using=self.db
+            )
+    
+    def bulk_unassign(self, library_ids, book_ids, batch_size=900):
+        """
+        Remove every book in `book_ids` from every library in `library_ids`
+        with batched DELETEs on the through table. Sends
+        library_books_bulk_changed once at the end. The default batch size
+        keeps each DELETE under SQLite's 999 bound-parameter limit on older
+        builds.
+        """
+        Membership = self.model.books.through
+        library_ids = list(library_ids)
+        book_ids = list(book_ids)
+        with transaction.atomic(using=self.db):
+            for libraries, books in self._membership_batches(library_ids, book_ids, batch_size):
+                Membership.objects.using(self.db).filter(library_id__in=libraries, book_id__in=books).delete()
+            library_books_bulk_changed.send(
+                sender=self.model, action='unassign', library_ids=library_ids, book_ids=book_ids, using=self.db
+            )
+
 
 class Library(models.Model):
-    name = models.CharField(max_length=200)
+    name = models.CharField(max_length=200, unique=True)
     books = models.ManyToManyField(Book)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = LibraryQuerySet.as_manager()
     
     def __str__(self):
         return self.name
+    
+    def iter_book_chunks(self, chunk_size=2000):
+        """
+        Yield the library's books, with their authors, as lists of at most
+        chunk_size, in id order. Each chunk is one query that seeks on the
+        through table's (library_id, book_id) index past the previous
+        chunk, so memory stays bounded and no chunk costs more than the
+        first, however many books the library holds.
+        """
+        Membership = Library.books.through
+        memberships = (
+            Membership.objects.filter(library_id=self.pk)
+            .select_related('book__author')
+            .order_by('book_id')
+        )
+        last_id = None
+        while True:
+            page = memberships if last_id is None else memberships.filter(book_id__gt=last_id)
+            chunk = [membership.book for membership in page[:chunk_size]]
+            if not chunk:
+                return
+            yield chunk
+            if len(chunk) < chunk_size:
+                return
+            last_id = chunk[-1].pk
+    
+    def iter_books(self, chunk_size=2000):
+        """
+        Iterate over all books of the library, with their authors, without
+        loading them all at once (unlike library.books.all()).
+        """
+        for chunk in self.iter_book_chunks(chunk_size):
+            yield from chunk
 
 class Librarian(models.Model):
     name = models.CharField(max_length=200)
     library = models.OneToOneField(Library, on_delete=models.CASCADE)
     # Update to use custom user model
-    user = models.OneToOneField('CustomUser', on_delete=models.CASCADE, null=True, blank=True)
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
     
     def __str__(self):
         return self.name
 
+
+class UserProfile(models.Model):
+    """
+    The role of a user, read by the role-based views.
+    Created with every new user (see signals.py).
+    """
+    ROLE_CHOICES = [
+        ('Admin', 'Admin'),
+        ('Librarian', 'Librarian'),
+        ('Member', 'Member'),
+    ]
+    
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='Member')
+    
+    def __str__(self):
+        return f"{self.user} ({self.role})"
+
+
+
+class LibraryStats(models.Model):
+    """
+    Denormalized per-library counters for dashboards. Kept up to date
+    incrementally by signals (see stats.py); `manage.py
+    rebuild_library_stats` recomputes them if they drift.
+    """
+    library = models.OneToOneField(Library, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    book_count = models.PositiveIntegerField(default=0)
+    author_count = models.PositiveIntegerField(default=0)
+    last_changed = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name_plural = 'Library stats'
+    
+    def __str__(self):
+        return f"{self.library}: {self.book_count} books, {self.author_count} authors"
@@ -0,0 +1,116 @@
+import base64
+import json
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(title, pk, direction):
+    """
+    Pack a (title, id) position and a direction ('next' or 'prev') into an
+    opaque, URL-safe token.
+    """
+    payload = json.dumps([title, pk, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Reverse encode_cursor. Raises ValueError for tokens we did not issue.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        title, pk, direction = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (TypeError, ValueError, UnicodeError) as exc:
+        raise ValueError('Invalid cursor') from exc
+    if not isinstance(title, str) or not isinstance(pk, int) or direction not in ('next', 'prev'):
+        raise ValueError('Invalid cursor')
+    return title, pk, direction
+
+
+class KeysetPage:
+    """
+    One page of a keyset-paginated queryset, with tokens for its neighbours.
+    """
+    def __init__(self, object_list, next_cursor=None, prev_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset on (title, id) so that every page is a bounded
+    index range scan instead of an OFFSET that grows with the catalog.
+    """
+    def __init__(self, queryset, page_size=DEFAULT_PAGE_SIZE):
+        self.queryset = queryset
+        self.page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+
+    def _query(self, cursor):
+        """
+        Return the sliced queryset for the page at `cursor` and the
+        direction it was fetched in (None for the first page).
+        """
+        if not cursor:
+            return self.queryset.order_by('title', 'id')[:self.page_size + 1], None
+        title, pk, direction = decode_cursor(cursor)
+        # The title__gte/lte bound is implied by the OR, but without it the
+        # database cannot seek to the cursor and scans the (title, id)
+        # index from the start, so deep pages would get slower.
+        if direction == 'next':
+            queryset = (
+                self.queryset
+                .filter(Q(title__gt=title) | Q(title=title, id__gt=pk), title__gte=title)
+                .order_by('title', 'id')
+            )
+        else:
+            queryset = (
+                self.queryset
+                .filter(Q(title__lt=title) | Q(title=title, id__lt=pk), title__lte=title)
+                .order_by('-title', '-id')
+            )
+        return queryset[:self.page_size + 1], direction
+
+    def page(self, cursor=None):
+        queryset, direction = self._query(cursor)
+        return self._build(list(queryset), direction)
+
+    async def apage(self, cursor=None):
+        queryset, direction = self._query(cursor)
+        return self._build([row async for row in queryset], direction)
+
+    def _build(self, rows, direction):
+        # One extra row was fetched to tell whether more exist that way.
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if direction == 'prev':
+            rows.reverse()
+            has_next, has_prev = True, has_more
+        else:
+            has_next, has_prev = has_more, direction == 'next'
+
+        next_cursor = prev_cursor = None
+        if rows and has_next:
+            last = rows[-1]
+            next_cursor = encode_cursor(last.title, last.pk, 'next')
+        if rows and has_prev:
+            first = rows[0]
+            prev_cursor = encode_cursor(first.title, first.pk, 'prev')
+        return KeysetPage(rows, next_cursor, prev_cursor)
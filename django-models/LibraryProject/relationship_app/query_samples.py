@@ -13,5 +13,9 @@ library_name = "Some Library"
 library = Library.objects.get(name=library_name)
 books_in_library = library.books.all()
 
+# The same books, fetched lazily in chunks of 2000 for libraries too large
+# to load at once
+books_in_library_chunked = library.iter_books(chunk_size=2000)
+
 # Retrieve the librarian for that library
 librarian = Librarian.objects.get(library=library)
\ No newline at end of file
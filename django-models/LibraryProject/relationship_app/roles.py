@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.core.cache import cache
+
+ROLE_CACHE_TIMEOUT = getattr(settings, 'ROLE_CACHE_TIMEOUT', 60)
+
+# Stored in the cache for users without a profile, so they are not looked
+# up again until the entry expires.
+NO_ROLE = ''
+
+
+def _role_key(user_id):
+    return f'user:{user_id}:role'
+
+
+def get_user_role(user):
+    """
+    Return the role ('Admin', 'Librarian', 'Member') of a user, or None.
+    The result is kept on the user object for the rest of the request and
+    in the cache for ROLE_CACHE_TIMEOUT seconds.
+    """
+    if not user.is_authenticated:
+        return None
+    if hasattr(user, '_cached_role'):
+        return user._cached_role
+
+    from .models import UserProfile
+
+    key = _role_key(user.pk)
+    role = cache.get(key)
+    if role is None:
+        role = (
+            UserProfile.objects.filter(user_id=user.pk)
+            .values_list('role', flat=True)
+            .first()
+        ) or NO_ROLE
+        cache.set(key, role, ROLE_CACHE_TIMEOUT)
+    user._cached_role = role or None
+    return user._cached_role
+
+
+async def aget_user_role(user):
+    """
+    Async counterpart of get_user_role.
+    """
+    if not user.is_authenticated:
+        return None
+    if hasattr(user, '_cached_role'):
+        return user._cached_role
+
+    from .models import UserProfile
+
+    key = _role_key(user.pk)
+    role = await cache.aget(key)
+    if role is None:
+        role = await (
+            UserProfile.objects.filter(user_id=user.pk)
+            .values_list('role', flat=True)
+            .afirst()
+        ) or NO_ROLE
+        await cache.aset(key, role, ROLE_CACHE_TIMEOUT)
+    user._cached_role = role or None
+    return user._cached_role
+
+
+def invalidate_user_role(user_id):
+    cache.delete(_role_key(user_id))
+
+
+def is_admin(user):
+    return get_user_role(user) == 'Admin'
+
+
+def is_librarian(user):
+    return get_user_role(user) == 'Librarian'
+
+
+def is_member(user):
+    return get_user_role(user) == 'Member'
@@ -0,0 +1,62 @@
+import contextvars
+
+from django.conf import settings
+
+REPLICA_ALIAS = 'replica'
+
+# Models whose reads may be served by the replica.
+CATALOG_MODELS = {'book', 'author', 'library', 'librarian'}
+
+# True once the current request (or task) wrote to the primary, and True
+# for the rest of it: later reads must see that write.
+_wrote = contextvars.ContextVar('replica_wrote', default=False)
+_pinned = contextvars.ContextVar('replica_pinned', default=False)
+
+
+def start_request(pinned=False):
+    """
+    Reset the per-request state; `pinned` keeps every read on the primary,
+    e.g. for a client that wrote within the last few seconds.
+    """
+    _wrote.set(False)
+    _pinned.set(pinned)
+
+
+def wrote_to_primary():
+    return _wrote.get()
+
+
+def replica_enabled():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+class CatalogReplicaRouter:
+    """
+    Sends reads of the catalog models (Book, Author, Library, Librarian) to
+    the 'replica' database and everything else, including all writes and
+    auth, to 'default'. After a write, reads stay on the primary for the
+    rest of the request; ReplicaPinningMiddleware extends that to the
+    client's following requests.
+    """
+    def _is_catalog(self, model):
+        return model._meta.app_label == 'relationship_app' and model._meta.model_name in CATALOG_MODELS
+
+    def db_for_read(self, model, **hints):
+        if not replica_enabled() or not self._is_catalog(model):
+            return 'default'
+        if _pinned.get() or _wrote.get():
+            return 'default'
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if self._is_catalog(model):
+            _wrote.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data, so objects may be related freely.
+        return obj1._state.db in ('default', REPLICA_ALIAS) and obj2._state.db in ('default', REPLICA_ALIAS)
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives its schema through replication.
+        return db == 'default'
@@ -1,9 +1,173 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from django.contrib.auth.models import User
-from .models import UserProfile
+from django.utils import timezone
+from django.conf import settings
+from .cache import bump_catalog_version, bump_library_versions
+from .models import Author, Book, Library, LibraryStats, UserProfile, library_books_bulk_changed
+from . import stats
+from .roles import invalidate_user_role
 
-@receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
-    if created:
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
         UserProfile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def user_profile_changed(sender, instance, **kwargs):
+    invalidate_user_role(instance.user_id)
+
+
+# Library page cache invalidation: any change that can alter a rendered
+# library page bumps that library's version counter (see cache.py).
+
+@receiver(m2m_changed, sender=Library.books.through)
+def library_books_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            bump_library_versions([instance.pk])
+        return
+    # Reverse side (book.library_set.add/remove/clear): instance is a Book.
+    if action == 'pre_clear':
+        instance._cached_library_ids = list(
+            Library.objects.filter(books=instance).values_list('pk', flat=True)
+        )
+    elif action in ('post_add', 'post_remove'):
+        bump_library_versions(pk_set or [])
+    elif action == 'post_clear':
+        bump_library_versions(getattr(instance, '_cached_library_ids', []))
+
+
+@receiver(post_save, sender=Library)
+def library_saved(sender, instance, **kwargs):
+    # The page shows the library's own fields too, e.g. its name.
+    bump_library_versions([instance.pk])
+
+
+@receiver(pre_save, sender=Book)
+def book_author_name(sender, instance, update_fields=None, **kwargs):
+    # Keep the denormalized author name in step with the author FK.
+    # Book.save() adds author_name to update_fields that name the author.
+    if instance.author_id is not None and (update_fields is None or 'author_name' in update_fields):
+        instance.author_name = instance.author.name
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, **kwargs):
+    bump_library_versions(
+        Library.objects.filter(books=instance).values_list('pk', flat=True)
+    )
+
+
+@receiver(pre_save, sender=Author)
+def author_renaming(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Remember the stored name, so author_saved can tell a rename from any
+    # other save.
+    instance._renamed_from = None
+    if instance.pk is None or raw or (update_fields is not None and 'name' not in update_fields):
+        return
+    old_name = Author.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+    if old_name is not None and old_name != instance.name:
+        instance._renamed_from = old_name
+
+
+@receiver(post_save, sender=Author)
+def author_saved(sender, instance, created, **kwargs):
+    # Pages show an author only through the name copied into each book
+    # row, so only a rename changes them. Rewrite the copies and move the
+    # books' updated_at so their cached template fragments are not reused.
+    if created or getattr(instance, '_renamed_from', None) is None:
+        return
+    bump_library_versions(
+        Library.objects.filter(books__author=instance).distinct().values_list('pk', flat=True)
+    )
+    Book.objects.filter(author=instance).update(author_name=instance.name, updated_at=timezone.now())
+
+
+# Memberships are removed before post_delete fires, so remember the
+# affected libraries while they can still be looked up.
+
+@receiver(pre_delete, sender=Book)
+def book_deleting(sender, instance, **kwargs):
+    instance._cached_library_ids = list(
+        Library.objects.filter(books=instance).values_list('pk', flat=True)
+    )
+
+
+@receiver(pre_delete, sender=Author)
+def author_deleting(sender, instance, **kwargs):
+    instance._cached_library_ids = list(
+        Library.objects.filter(books__author=instance).distinct().values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Author)
+def catalog_deleted(sender, instance, **kwargs):
+    bump_library_versions(getattr(instance, '_cached_library_ids', []))
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted(sender, instance, **kwargs):
+    # Changes the list_books ETag (conditional.py).
+    bump_catalog_version()
+
+
+# Library statistics: apply each membership change as a delta to the
+# LibraryStats row instead of recounting (see stats.py).
+
+@receiver(post_save, sender=Library)
+def library_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        LibraryStats.objects.get_or_create(library=instance)
+
+
+@receiver(m2m_changed, sender=Library.books.through)
+def library_books_stats(sender, instance, action, reverse, pk_set, **kwargs):
+    # remove() reports every id it was given in pk_set, members or not
+    # (add() already leaves out existing members), so the memberships that
+    # really go away are looked up on pre_remove.
+    if action == 'pre_remove':
+        if reverse:
+            members = sender.objects.filter(book_id=instance.pk, library_id__in=pk_set or ())
+            instance._removed_ids = list(members.values_list('library_id', flat=True))
+        else:
+            members = sender.objects.filter(library_id=instance.pk, book_id__in=pk_set or ())
+            instance._removed_ids = list(members.values_list('book_id', flat=True))
+        return
+    if not reverse:
+        if action == 'post_add' and pk_set:
+            stats.books_added(instance.pk, pk_set)
+        elif action == 'post_remove':
+            removed = getattr(instance, '_removed_ids', [])
+            if removed:
+                stats.books_removed(instance.pk, removed)
+        elif action == 'post_clear':
+            stats.library_cleared(instance.pk)
+        return
+    # Reverse side: instance is a Book and pk_set holds library ids.
+    if action == 'post_add':
+        for library_id in pk_set or ():
+            stats.books_added(library_id, [instance.pk])
+    elif action == 'post_remove':
+        for library_id in getattr(instance, '_removed_ids', []):
+            stats.books_removed(library_id, [instance.pk])
+    elif action == 'post_clear':
+        # Captured in library_books_changed on pre_clear.
+        for library_id in getattr(instance, '_cached_library_ids', []):
+            stats.books_removed(library_id, [instance.pk])
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted_stats(sender, instance, **kwargs):
+    # Captured in book_deleting, before the memberships were removed.
+    for library_id in getattr(instance, '_cached_library_ids', []):
+        stats.books_removed(library_id, [instance.pk], author_ids=[instance.author_id])
+
+
+@receiver(library_books_bulk_changed, sender=Library)
+def library_books_bulk_changed_handler(sender, library_ids, **kwargs):
+    # One recount per affected library instead of one delta per membership.
+    bump_library_versions(library_ids)
+    stats.save_library_stats(list(stats.compute_library_stats(library_ids)))
@@ -0,0 +1,86 @@
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Book, Library, LibraryStats
+
+Membership = Library.books.through
+
+
+def compute_library_stats(library_ids=None):
+    """
+    Recount books and distinct authors per library with aggregates.
+    Yields unsaved LibraryStats objects; used for rebuilds and to repair a
+    missing row, never on the request path.
+    """
+    libraries = Library.objects.order_by('pk')
+    if library_ids is not None:
+        libraries = libraries.filter(pk__in=library_ids)
+    rows = libraries.annotate(
+        n_books=Count('books', distinct=True),
+        n_authors=Count('books__author', distinct=True),
+    ).values_list('pk', 'n_books', 'n_authors')
+    now = timezone.now()
+    for pk, n_books, n_authors in rows.iterator(chunk_size=500):
+        yield LibraryStats(library_id=pk, book_count=n_books, author_count=n_authors, last_changed=now)
+
+
+def save_library_stats(stats, batch_size=500):
+    LibraryStats.objects.bulk_create(
+        stats,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['library'],
+        update_fields=['book_count', 'author_count', 'last_changed'],
+    )
+
+
+def adjust_library_stats(library_id, books=0, authors=0):
+    """
+    Apply a delta to one library's counters in a single UPDATE.
+    """
+    updated = LibraryStats.objects.filter(library_id=library_id).update(
+        book_count=Greatest(F('book_count') + books, 0),
+        author_count=Greatest(F('author_count') + authors, 0),
+        last_changed=timezone.now(),
+    )
+    if not updated:
+        # No row yet (e.g. a library created before the stats existed).
+        save_library_stats(list(compute_library_stats([library_id])))
+
+
+def _authors_in_library(library_id, author_ids, exclude_book_ids=()):
+    """
+    Return which of `author_ids` still have a book in the library, ignoring
+    `exclude_book_ids`. Only touches the rows for those authors.
+    """
+    return set(
+        Membership.objects.filter(library_id=library_id, book__author_id__in=author_ids)
+        .exclude(book_id__in=exclude_book_ids)
+        .values_list('book__author_id', flat=True)
+        .distinct()
+    )
+
+
+def books_added(library_id, book_ids):
+    author_ids = set(Book.objects.filter(pk__in=book_ids).values_list('author_id', flat=True))
+    new_authors = author_ids - _authors_in_library(library_id, author_ids, exclude_book_ids=book_ids)
+    adjust_library_stats(library_id, books=len(book_ids), authors=len(new_authors))
+
+
+def books_removed(library_id, book_ids=(), author_ids=None):
+    """
+    Account for books that left a library. Call after the memberships are
+    gone; pass author_ids when the books themselves were deleted.
+    """
+    if author_ids is None:
+        author_ids = set(Book.objects.filter(pk__in=book_ids).values_list('author_id', flat=True))
+    gone = set(author_ids) - _authors_in_library(library_id, author_ids)
+    adjust_library_stats(library_id, books=-len(book_ids), authors=-len(gone))
+
+
+def library_cleared(library_id):
+    LibraryStats.objects.update_or_create(
+        library_id=library_id,
+        defaults={'book_count': 0, 'author_count': 0, 'last_changed': timezone.now()},
+    )
@@ -1,3 +1,825 @@
-from django.test import TestCase
+import io
+import os
+import re
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from bookshelf.models import Book as ShelfBook
+
+from . import async_views
+from .cache import get_cache, get_library_version
+from .export import arender_catalog
+from .metrics import metrics_view, registry
+from .middleware import REPLICA_PIN_COOKIE, QueryMetricsMiddleware, ReplicaPinningMiddleware, UserRoleMiddleware
+from .models import Author, Book, BookRow, Library, LibraryStats, UserProfile, library_books_bulk_changed
+from .pagination import KeysetPaginator, decode_cursor, encode_cursor
+from .roles import get_user_role, is_librarian, is_member
+from .routers import REPLICA_ALIAS, start_request
+from .views import LibraryDetailView, list_books
+
+
+class LibraryDetailViewQueryBudgetTests(TestCase):
+    """
+    Guards the number of queries needed to render a library page, so that
+    per-book lookups (N+1) fail the build instead of reaching production.
+    """
+    QUERY_BUDGET = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.library = Library.objects.create(name='Central')
+        authors = [Author.objects.create(name=f'Author {i}') for i in range(5)]
+        books = [Book.objects.create(title=f'Book {i}', author=authors[i % 5]) for i in range(20)]
+        cls.library.books.set(books)
+
+    def setUp(self):
+        get_cache().clear()
+
+    def render(self):
+        request = RequestFactory().get(f'/library/{self.library.pk}/')
+        response = LibraryDetailView.as_view()(request, pk=self.library.pk)
+        response.render()
+        return response
+
+    def test_query_count_within_budget(self):
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.render()
+        self.assertContains(response, 'Book 19 by Author 4')
+
+    def test_query_count_independent_of_book_count(self):
+        extra_author = Author.objects.create(name='Extra')
+        self.library.books.add(*[
+            Book.objects.create(title=f'Extra {i}', author=extra_author) for i in range(10)
+        ])
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            self.render()
+
+
+class LibraryPageCacheTests(TestCase):
+    """
+    The rendered library page is reused until a write touches that library.
+    """
+    def setUp(self):
+        get_cache().clear()
+        self.author = Author.objects.create(name='Ursula')
+        self.book = Book.objects.create(title='Earthsea', author=self.author)
+        self.library = Library.objects.create(name='Branch')
+        self.library.books.add(self.book)
+        self.other = Library.objects.create(name='Other')
+
+    def get(self, library):
+        request = RequestFactory().get(f'/library/{library.pk}/')
+        response = LibraryDetailView.as_view()(request, pk=library.pk)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def test_second_request_is_served_from_cache(self):
+        self.get(self.library)
+        with self.assertNumQueries(0):
+            response = self.get(self.library)
+        self.assertContains(response, 'Earthsea by Ursula')
+
+    def test_membership_change_invalidates_page(self):
+        self.get(self.library)
+        self.library.books.add(Book.objects.create(title='Tehanu', author=self.author))
+        self.assertContains(self.get(self.library), 'Tehanu')
+
+    def test_book_and_author_edits_invalidate_page(self):
+        self.get(self.library)
+        self.book.title = 'A Wizard of Earthsea'
+        self.book.save()
+        self.assertContains(self.get(self.library), 'A Wizard of Earthsea')
+        self.author.name = 'Ursula K. Le Guin'
+        self.author.save()
+        self.assertContains(self.get(self.library), 'Ursula K. Le Guin')
+
+    def test_library_edit_invalidates_page(self):
+        etag = self.get(self.library)['ETag']
+        self.library.name = 'Riverside'
+        self.library.save()
+        response = self.get(self.library)
+        self.assertContains(response, 'Riverside')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_book_delete_invalidates_page(self):
+        self.get(self.library)
+        self.book.delete()
+        self.assertNotContains(self.get(self.library), 'Earthsea')
+
+    def test_unrelated_library_keeps_its_cache(self):
+        self.get(self.other)
+        self.library.books.add(Book.objects.create(title='Tehanu', author=self.author))
+        with self.assertNumQueries(0):
+            self.get(self.other)
+
+
+class ConditionalGetTests(TestCase):
+    """
+    Unchanged catalog pages are answered with 304 Not Modified.
+    """
+    def setUp(self):
+        get_cache().clear()
+        self.author = Author.objects.create(name='Octavia')
+        self.book = Book.objects.create(title='Kindred', author=self.author)
+        self.library = Library.objects.create(name='Branch')
+        self.library.books.add(self.book)
+
+    def get_library(self, **headers):
+        request = RequestFactory().get(f'/library/{self.library.pk}/', headers=headers)
+        response = LibraryDetailView.as_view()(request, pk=self.library.pk)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def get_books(self, **headers):
+        return list_books(RequestFactory().get('/books/', headers=headers))
+
+    def test_library_page_revalidation(self):
+        etag = self.get_library()['ETag']
+        with self.assertNumQueries(0):
+            response = self.get_library(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.book.title = 'Fledgling'
+        self.book.save()
+        self.assertEqual(self.get_library(if_none_match=etag).status_code, 200)
+
+    def test_library_page_if_modified_since(self):
+        last_modified = self.get_library()['Last-Modified']
+        self.assertEqual(self.get_library(if_modified_since=last_modified).status_code, 304)
+
+    def test_book_list_revalidation(self):
+        etag = self.get_books()['ETag']
+        with self.assertNumQueries(1):
+            response = self.get_books(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Book.objects.create(title='Dawn', author=self.author)
+        self.assertEqual(self.get_books(if_none_match=etag).status_code, 200)
+
+    def test_book_list_changes_on_delete(self):
+        Book.objects.create(title='Dawn', author=self.author)
+        etag = self.get_books()['ETag']
+        self.book.delete()
+        self.assertEqual(self.get_books(if_none_match=etag).status_code, 200)
+
+
+class QueryMetricsTests(TestCase):
+    """
+    QueryMetricsMiddleware attributes queries to the view that ran them and
+    /metrics reports them per URL name.
+    """
+    def setUp(self):
+        registry.reset()
+        self.factory = RequestFactory()
+
+    def test_queries_and_duplicates_reported_per_view(self):
+        author = Author.objects.create(name='Author')
+
+        def view(request):
+            request.resolver_match = resolve('/metrics')
+            for _ in range(3):
+                Author.objects.get(pk=author.pk)
+            return HttpResponse()
+
+        QueryMetricsMiddleware(view)(self.factory.get('/'))
+        with self.settings(METRICS_ALLOWED_IPS=['127.0.0.1']):
+            response = metrics_view(self.factory.get('/metrics'))
+        self.assertContains(response, 'django_view_requests_total{view="metrics"} 1')
+        self.assertContains(response, 'django_view_queries_total{view="metrics"} 3')
+        self.assertContains(response, 'django_view_duplicate_queries_total{view="metrics"} 2')
+        self.assertContains(response, 'django_view_latency_seconds_count{view="metrics"} 1')
+
+    def test_metrics_private_by_default(self):
+        self.assertEqual(metrics_view(self.factory.get('/metrics')).status_code, 403)
+
+    @override_settings(METRICS_TOKEN='s3cret', METRICS_ALLOWED_IPS=['192.0.2.1'])
+    def test_metrics_access(self):
+        for headers, remote_addr, status in [
+            ({'authorization': 'Bearer s3cret'}, '127.0.0.1', 200),
+            ({'authorization': 'Bearer wrong'}, '127.0.0.1', 403),
+            ({}, '127.0.0.1', 403),
+            ({}, '192.0.2.1', 200),
+        ]:
+            request = self.factory.get('/metrics', headers=headers, REMOTE_ADDR=remote_addr)
+            with self.subTest(headers=headers, remote_addr=remote_addr):
+                self.assertEqual(metrics_view(request).status_code, status)
+
+
+class AuthorNameDenormalizationTests(TestCase):
+    """
+    Book.author_name follows the author FK and the author's name, so list
+    pages can skip the author join.
+    """
+    def test_author_name_kept_in_sync(self):
+        author = Author.objects.create(name='Ursula')
+        other = Author.objects.create(name='Octavia')
+        book = Book.objects.create(title='Earthsea', author=author)
+        self.assertEqual(book.author_name, 'Ursula')
+
+        author.name = 'Ursula K. Le Guin'
+        author.save()
+        book.refresh_from_db()
+        self.assertEqual(book.author_name, 'Ursula K. Le Guin')
+
+        book.author = other
+        book.save()
+        book.refresh_from_db()
+        self.assertEqual(book.author_name, 'Octavia')
+
+    def test_partial_save_of_author_refreshes_name_and_updated_at(self):
+        book = Book.objects.create(title='Earthsea', author=Author.objects.create(name='Ursula'))
+        created_at = book.updated_at
+        book.author = Author.objects.create(name='Octavia')
+        book.save(update_fields=['author'])
+        saved = Book.objects.get(pk=book.pk)
+        self.assertEqual(saved.author_name, 'Octavia')
+        self.assertGreater(saved.updated_at, created_at)
+        book.title = 'Tehanu'
+        book.save(update_fields=['title'])
+        self.assertGreater(Book.objects.get(pk=book.pk).updated_at, saved.updated_at)
+
+    def test_saving_author_without_rename_leaves_books_alone(self):
+        author = Author.objects.create(name='Ursula')
+        book = Book.objects.create(title='Earthsea', author=author)
+        library = Library.objects.create(name='Branch')
+        library.books.add(book, Book.objects.create(title='Tehanu', author=author))
+        version = get_library_version(library.pk)
+        author.save()
+        self.assertEqual(Book.objects.get(pk=book.pk).updated_at, book.updated_at)
+        self.assertEqual(get_library_version(library.pk), version)
+        author.name = 'Ursula K. Le Guin'
+        author.save()
+        self.assertGreater(Book.objects.get(pk=book.pk).updated_at, book.updated_at)
+        self.assertEqual(get_library_version(library.pk), version + 1)
+
+    def test_book_list_does_not_join_authors(self):
+        Book.objects.create(title='Kindred', author=Author.objects.create(name='Octavia'))
+        with CaptureQueriesContext(connection) as captured:
+            response = list_books(RequestFactory().get('/books/'))
+        self.assertContains(response, 'Kindred by Octavia')
+        self.assertFalse(any('relationship_app_author' in query['sql'] for query in captured))
+
+
+class CatalogIndexMigrationTests(TransactionTestCase):
+    """
+    0002_catalog_indexes merges authors and libraries sharing a name before
+    making the names unique.
+    """
+    before = [('relationship_app', '0001_initial')]
+    after = [('relationship_app', '0002_catalog_indexes')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicate_names_are_merged(self):
+        apps = self.migrate(self.before)
+        Author = apps.get_model('relationship_app', 'Author')
+        Book = apps.get_model('relationship_app', 'Book')
+        Library = apps.get_model('relationship_app', 'Library')
+        Librarian = apps.get_model('relationship_app', 'Librarian')
+        first, second = Author.objects.create(name='Ursula'), Author.objects.create(name='Ursula')
+        earthsea = Book.objects.create(title='Earthsea', author=first)
+        tehanu = Book.objects.create(title='Tehanu', author=second)
+        kept, merged = Library.objects.create(name='Branch'), Library.objects.create(name='Branch')
+        kept.books.add(earthsea)
+        merged.books.add(earthsea, tehanu)
+        Librarian.objects.create(name='Ann', library=merged)
+
+        apps = self.migrate(self.after)
+        Book = apps.get_model('relationship_app', 'Book')
+        Library = apps.get_model('relationship_app', 'Library')
+        self.assertEqual(list(apps.get_model('relationship_app', 'Author').objects.values_list('pk', flat=True)), [first.pk])
+        self.assertEqual(set(Book.objects.values_list('author_id', flat=True)), {first.pk})
+        library = Library.objects.get()
+        self.assertEqual(library.pk, kept.pk)
+        self.assertEqual(set(library.books.values_list('pk', flat=True)), {earthsea.pk, tehanu.pk})
+        self.assertEqual(apps.get_model('relationship_app', 'Librarian').objects.get().library_id, kept.pk)
+
+
+class BookListingTests(TestCase):
+    def test_listing_returns_read_only_rows(self):
+        author = Author.objects.create(name='Octavia')
+        book = Book.objects.create(title='Kindred', author=author)
+        [row] = Book.objects.listing()
+        self.assertIsInstance(row, BookRow)
+        self.assertEqual((row.pk, row.title, row.author_name, row.updated_at),
+                         (book.pk, 'Kindred', 'Octavia', book.updated_at))
+        self.assertFalse(hasattr(row, '__dict__'))
+
+
+class LibraryIterBooksTests(TestCase):
+    def test_walks_all_books_in_chunks(self):
+        author = Author.objects.create(name='Author')
+        library = Library.objects.create(name='Central')
+        other = Library.objects.create(name='Branch')
+        books = [Book.objects.create(title=f'Book {i}', author=author) for i in range(5)]
+        library.books.set(books)
+        other.books.set(books[:2])
+
+        with self.assertNumQueries(3):
+            walked = list(library.iter_books(chunk_size=2))
+        self.assertEqual([book.pk for book in walked], [book.pk for book in books])
+        with self.assertNumQueries(0):
+            self.assertEqual(walked[-1].author.name, 'Author')
+
+
+class UserRoleTests(TestCase):
+    """
+    Roles are read from UserProfile once, cached, and dropped from the
+    cache when the profile changes.
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(email='reader@example.com', username='reader')
+
+    def fresh_user(self):
+        return get_user_model().objects.get(pk=self.user.pk)
+
+    def test_new_users_get_a_member_profile(self):
+        self.assertEqual(UserProfile.objects.get(user=self.user).role, 'Member')
+
+    def test_role_is_cached(self):
+        self.assertEqual(get_user_role(self.fresh_user()), 'Member')
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_role(user), 'Member')
+
+    def test_profile_change_invalidates_cached_role(self):
+        get_user_role(self.fresh_user())
+        UserProfile.objects.filter(user=self.user).update(role='Librarian')
+        self.assertEqual(get_user_role(self.fresh_user()), 'Member')
+        profile = UserProfile.objects.get(user=self.user)
+        profile.save()
+        self.assertEqual(get_user_role(self.fresh_user()), 'Librarian')
+        profile.delete()
+        self.assertIsNone(get_user_role(self.fresh_user()))
+
+    def test_middleware_resolves_role_for_the_checks(self):
+        request = RequestFactory().get('/')
+        request.user = self.fresh_user()
+        UserRoleMiddleware(lambda request: HttpResponse())(request)
+        with self.assertNumQueries(0):
+            self.assertTrue(is_member(request.user))
+            self.assertFalse(is_librarian(request.user))
+
+    async def test_async_middleware_resolves_role_on_request_user(self):
+        user = await get_user_model().objects.aget(pk=self.user.pk)
+
+        async def auser():
+            return user
+
+        async def get_response(request):
+            return HttpResponse()
+
+        request = AsyncRequestFactory().get('/')
+        request.user = object()
+        request.auser = auser
+        await UserRoleMiddleware(get_response)(request)
+        self.assertIs(request.user, user)
+        self.assertEqual(request.user._cached_role, 'Member')
+
+
+class AsyncCatalogViewTests(TestCase):
+    """
+    The async catalog views (served under ASGI) behave like the sync ones.
+    """
+    def setUp(self):
+        get_cache().clear()
+        self.factory = AsyncRequestFactory()
+        author = Author.objects.create(name='Octavia')
+        self.library = Library.objects.create(name='Branch')
+        self.library.books.add(Book.objects.create(title='Kindred', author=author))
+
+    def get_books(self, **headers):
+        return async_to_sync(async_views.list_books)(self.factory.get('/books/', headers=headers))
+
+    def get_library(self, **headers):
+        view = async_views.LibraryDetailView.as_view()
+        return async_to_sync(view)(self.factory.get(f'/library/{self.library.pk}/', headers=headers), pk=self.library.pk)
+
+    def test_list_page_and_revalidation(self):
+        response = self.get_books()
+        self.assertContains(response, 'Kindred by Octavia')
+        self.assertEqual(self.get_books(if_none_match=response['ETag']).status_code, 304)
+
+    def test_library_page_served_from_cache(self):
+        self.assertContains(self.get_library(), 'Kindred by Octavia')
+        with self.assertNumQueries(0):
+            response = self.get_library()
+        self.assertContains(response, 'Kindred by Octavia')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_library(if_none_match=response['ETag']).status_code, 304)
+
+    async def test_delete_confirmation_renders_in_a_worker_thread(self):
+        user = await get_user_model().objects.acreate(email='clerk@example.com', username='clerk', is_superuser=True)
+        book = await Book.objects.aget(title='Kindred')
+
+        async def auser():
+            return user
+
+        def render(request, template_name, context):
+            # Loads the author, which the async ORM would refuse outside a
+            # worker thread.
+            return HttpResponse(context['book'].author.name)
+
+        request = self.factory.get(f'/books/delete/{book.pk}/')
+        request.auser = auser
+        with mock.patch.object(async_views, 'render', render):
+            response = await async_views.delete_book(request, book_id=book.pk)
+        self.assertEqual(response.content, b'Octavia')
+
+    def test_catalog_urls_are_mounted(self):
+        self.assertEqual(self.client.get(reverse('book-list')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('library-detail', args=[self.library.pk])).status_code, 200)
+
+
+class KeysetPaginatorTests(TestCase):
+    """
+    Cursors walk the catalog in (title, id) order in both directions.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(name='Author')
+        # Duplicate titles, so the id tie-breaker matters.
+        for i in range(7):
+            Book.objects.create(title=f'Book {i // 2}', author=author)
+        cls.ordered = list(Book.objects.order_by('title', 'id').values_list('pk', flat=True))
+
+    def paginate(self, cursor=None):
+        return KeysetPaginator(Book.objects.listing(), page_size=3).page(cursor)
+
+    def test_cursor_round_trip(self):
+        token = encode_cursor('Ünïcode title', 42, 'prev')
+        self.assertEqual(decode_cursor(token), ('Ünïcode title', 42, 'prev'))
+
+    def test_next_and_prev_walk_every_row_once(self):
+        first = self.paginate()
+        self.assertFalse(first.has_previous)
+        second = self.paginate(first.next_cursor)
+        last = self.paginate(second.next_cursor)
+        self.assertFalse(last.has_next)
+        walked = [row.pk for page in (first, second, last) for row in page]
+        self.assertEqual(walked, self.ordered)
+
+        back = self.paginate(last.prev_cursor)
+        self.assertEqual([row.pk for row in back], [row.pk for row in second])
+        self.assertTrue(back.has_next)
+        start = self.paginate(back.prev_cursor)
+        self.assertEqual([row.pk for row in start], self.ordered[:3])
+        self.assertFalse(start.has_previous)
+
+    def test_invalid_cursors_are_rejected(self):
+        for token in ('not base64!', encode_cursor('Book', 'x', 'next')[:-2], 'W10', encode_cursor('Book', 1, 'up')):
+            with self.subTest(token=token), self.assertRaises(ValueError):
+                self.paginate(token)
+        response = list_books(RequestFactory().get('/books/', {'cursor': 'garbage'}))
+        self.assertEqual(response.status_code, 400)
+
+    def test_pages_seek_to_the_cursor(self):
+        for direction in ('next', 'prev'):
+            queryset, _ = KeysetPaginator(Book.objects.listing())._query(encode_cursor('Book 2', 1, direction))
+            with self.subTest(direction=direction):
+                self.assertIn('SEARCH', queryset.explain())
+
+
+class LibraryStatsTests(TestCase):
+    """
+    LibraryStats follows membership changes from either side of the
+    relation without recounting.
+    """
+    def setUp(self):
+        self.ursula = Author.objects.create(name='Ursula')
+        self.octavia = Author.objects.create(name='Octavia')
+        self.earthsea = Book.objects.create(title='Earthsea', author=self.ursula)
+        self.tehanu = Book.objects.create(title='Tehanu', author=self.ursula)
+        self.kindred = Book.objects.create(title='Kindred', author=self.octavia)
+        self.library = Library.objects.create(name='Branch')
+
+    def assertStats(self, book_count, author_count, library=None):
+        stats = LibraryStats.objects.get(library=library or self.library)
+        self.assertEqual((stats.book_count, stats.author_count), (book_count, author_count))
+
+    def test_add_and_remove(self):
+        self.assertStats(0, 0)
+        self.library.books.add(self.earthsea, self.tehanu, self.kindred)
+        self.assertStats(3, 2)
+        self.library.books.add(self.earthsea)
+        self.assertStats(3, 2)
+        self.library.books.remove(self.earthsea)
+        self.assertStats(2, 2)
+        self.library.books.remove(self.kindred)
+        self.assertStats(1, 1)
+        self.library.books.clear()
+        self.assertStats(0, 0)
+
+    def test_removing_non_members_changes_nothing(self):
+        self.library.books.add(self.earthsea)
+        self.library.books.remove(self.kindred, self.tehanu)
+        self.assertStats(1, 1)
+        self.kindred.library_set.remove(self.library)
+        self.assertStats(1, 1)
+
+    def test_reverse_side_and_book_delete(self):
+        other = Library.objects.create(name='Other')
+        self.kindred.library_set.add(self.library, other)
+        self.earthsea.library_set.add(self.library)
+        self.assertStats(2, 2)
+        self.assertStats(1, 1, library=other)
+        self.kindred.library_set.remove(self.library)
+        self.assertStats(1, 1)
+        self.earthsea.delete()
+        self.assertStats(0, 0)
+        self.kindred.library_set.clear()
+        self.assertStats(0, 0, library=other)
+
+
+class ImportBooksTests(TestCase):
+    """
+    import_books loads CSV and JSONL files, reuses authors, and reports the
+    byte offset to resume from when a record is malformed.
+    """
+    def write(self, name, text):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def run_import(self, path, **options):
+        out = io.StringIO()
+        call_command('import_books', path, stdout=out, **options)
+        return out.getvalue()
+
+    def test_csv_and_jsonl(self):
+        Author.objects.create(name='Ursula')
+        self.run_import(self.write('books.csv', 'title,author\nEarthsea,Ursula\n"Tehanu, the Last",Ursula \n'))
+        self.run_import(self.write('books.jsonl', '{"title": "Kindred", "author": "Octavia"}\n\n{"title": "Dawn", "author": "Octavia"}\n'))
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(
+            sorted(Book.objects.values_list('title', 'author__name', 'author_name')),
+            [('Dawn', 'Octavia', 'Octavia'), ('Earthsea', 'Ursula', 'Ursula'),
+             ('Kindred', 'Octavia', 'Octavia'), ('Tehanu, the Last', 'Ursula', 'Ursula')],
+        )
+
+    def test_bookshelf_target(self):
+        path = self.write('books.jsonl', '{"title": "Dune", "author": "Herbert", "publication_year": "1965"}\n')
+        self.run_import(path, target='bookshelf')
+        self.assertEqual(ShelfBook.objects.get().publication_year, 1965)
+
+    def test_malformed_records_report_resume_offset(self):
+        header = 'title,author,publication_year\n'
+        good = 'Dune,Herbert,1965\n'
+        for bad in ('Kindred,,1979\n', 'Kindred,Butler,\n', 'Kindred,Butler,soon\n', 'Kindred\n'):
+            path = self.write('books.csv', header + good + bad)
+            with self.subTest(bad=bad), self.assertRaisesMessage(CommandError, f'Malformed record at byte {len(header + good)}'):
+                self.run_import(path, target='bookshelf', batch_size=1)
+        path = self.write('books.jsonl', '[1, 2]\n')
+        with self.assertRaisesMessage(CommandError, 'Malformed record at byte 0'):
+            self.run_import(path)
+
+    def test_resume_from_offset(self):
+        path = self.write('books.csv', 'title,author\n' + ''.join(f'Book {i},Author {i % 2}\n' for i in range(5)))
+        output = self.run_import(path, batch_size=2)
+        offsets = [int(offset) for offset in re.findall(r'--offset (\d+)', output)]
+        self.assertEqual(len(offsets), 3)
+        Book.objects.all().delete()
+        self.run_import(path, offset=offsets[0])
+        self.assertEqual(
+            list(Book.objects.order_by('title').values_list('title', flat=True)),
+            ['Book 2', 'Book 3', 'Book 4'],
+        )
+        self.assertEqual(Author.objects.count(), 2)
+
+
+class CatalogExportTests(TestCase):
+    """
+    The catalog streams as CSV or JSONL from the export view, sync or async,
+    and from the export_catalog command.
+    """
+    def setUp(self):
+        author = Author.objects.create(name='Octavia')
+        self.kindred = Book.objects.create(title='Kindred', author=author)
+        self.dawn = Book.objects.create(title='Dawn', author=author)
+        self.library = Library.objects.create(name='Branch')
+        self.library.books.add(self.kindred)
+        self.user = get_user_model().objects.create_user(email='clerk@example.com', username='clerk')
+
+    def grant_view_book(self):
+        self.user.user_permissions.add(
+            Permission.objects.get(codename='view_book', content_type__app_label='relationship_app')
+        )
+        self.user = get_user_model().objects.get(pk=self.user.pk)
+
+    def test_export_requires_view_book_permission(self):
+        self.assertEqual(self.client.get(reverse('book-export')).status_code, 302)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('book-export')).status_code, 302)
+        self.grant_view_book()
+        self.assertEqual(self.client.get(reverse('book-export')).status_code, 200)
+
+    def test_streams_csv_and_jsonl(self):
+        self.grant_view_book()
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('book-export'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            b''.join(response.streaming_content).decode().splitlines(),
+            ['id,title,author,libraries', f'{self.kindred.pk},Kindred,Octavia,Branch', f'{self.dawn.pk},Dawn,Octavia,'],
+        )
+        response = self.client.get(reverse('book-export'), {'format': 'jsonl'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertIn(b'"libraries": ["Branch"]', b''.join(response.streaming_content))
+        self.assertEqual(self.client.get(reverse('book-export'), {'format': 'xml'}).status_code, 400)
+
+    async def test_async_export_streams_an_async_iterator(self):
+        await sync_to_async(self.grant_view_book)()
+
+        async def auser():
+            return self.user
+
+        request = AsyncRequestFactory().get('/books/export/', {'format': 'jsonl'})
+        request.auser = auser
+        response = await async_views.export_books(request)
+        self.assertTrue(response.is_async)
+        content = b''.join([piece async for piece in response.streaming_content])
+        self.assertEqual(content.count(b'\n'), 2)
+
+    async def test_async_render_sends_chunk_size_rows_per_piece(self):
+        pieces = [piece async for piece in arender_catalog('csv', chunk_size=1)]
+        self.assertEqual(pieces[0], 'id,title,author,libraries\r\n')
+        self.assertEqual(len(pieces), 3)
+
+    def test_export_catalog_command(self):
+        out = io.StringIO()
+        call_command('export_catalog', format='csv', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+        out = io.StringIO()
+        call_command('export_catalog', library=self.library.pk, stdout=out)
+        self.assertEqual(out.getvalue().count('"title": '), 1)
+        with self.assertRaisesMessage(CommandError, 'Library 0 does not exist'):
+            call_command('export_catalog', library=0, stdout=io.StringIO())
+
+
+class CatalogReplicaRouterTests(TestCase):
+    """
+    With a replica configured, catalog reads go to it until the request
+    writes, and a client that just wrote is pinned to the primary.
+    """
+    def setUp(self):
+        self.replica_enabled = mock.Mock(return_value=True)
+        for module in ('routers', 'middleware'):
+            patcher = mock.patch(f'relationship_app.{module}.replica_enabled', self.replica_enabled)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        start_request()
+        self.addCleanup(start_request)
+
+    def test_reads_use_replica_until_a_write(self):
+        self.assertEqual(Book.objects.all().db, REPLICA_ALIAS)
+        self.assertEqual(get_user_model().objects.all().db, 'default')
+        Author.objects.create(name='Ursula')
+        self.assertEqual(Book.objects.all().db, 'default')
+        start_request()
+        self.assertEqual(Book.objects.all().db, REPLICA_ALIAS)
+        start_request(pinned=True)
+        self.assertEqual(Book.objects.all().db, 'default')
+
+    def test_middleware_pins_clients_that_wrote(self):
+        factory = RequestFactory()
+        read_from = []
+
+        def read(request):
+            read_from.append(Book.objects.all().db)
+            return HttpResponse()
+
+        def write(request):
+            Author.objects.create(name='Octavia')
+            return read(request)
+
+        response = ReplicaPinningMiddleware(read)(factory.get('/'))
+        self.assertNotIn(REPLICA_PIN_COOKIE, response.cookies)
+        response = ReplicaPinningMiddleware(write)(factory.post('/'))
+        self.assertEqual(response.cookies[REPLICA_PIN_COOKIE]['max-age'], 5)
+        request = factory.get('/')
+        request.COOKIES[REPLICA_PIN_COOKIE] = '1'
+        ReplicaPinningMiddleware(read)(request)
+        ReplicaPinningMiddleware(read)(factory.get('/'))
+        self.assertEqual(read_from, [REPLICA_ALIAS, 'default', 'default', REPLICA_ALIAS])
+
+    def test_without_replica_everything_uses_default(self):
+        self.replica_enabled.return_value = False
+        self.assertEqual(Book.objects.all().db, 'default')
+        response = ReplicaPinningMiddleware(lambda request: HttpResponse(Author.objects.create(name='Ursula')))(
+            RequestFactory().post('/')
+        )
+        self.assertNotIn(REPLICA_PIN_COOKIE, response.cookies)
+
+
+class BulkMembershipTests(TestCase):
+    """
+    Library.objects.bulk_assign()/bulk_unassign() change memberships in
+    batches and notify receivers once per call.
+    """
+    def setUp(self):
+        self.authors = [Author.objects.create(name=f'Author {i}') for i in range(2)]
+        self.book_ids = [
+            Book.objects.create(title=f'Book {i}', author=self.authors[i % 2]).pk for i in range(7)
+        ]
+        self.libraries = [Library.objects.create(name=f'Library {i}') for i in range(3)]
+        self.library_ids = [library.pk for library in self.libraries[:2]]
+        self.sent = []
+        receiver = lambda sender, **kwargs: self.sent.append((kwargs['action'], kwargs['library_ids'], kwargs['book_ids']))
+        library_books_bulk_changed.connect(receiver, sender=Library, weak=False)
+        self.addCleanup(library_books_bulk_changed.disconnect, receiver, sender=Library)
+
+    def members(self, library):
+        return sorted(library.books.values_list('pk', flat=True))
+
+    def stats(self, library):
+        stats = LibraryStats.objects.get(library=library)
+        return stats.book_count, stats.author_count
+
+    def test_assign_in_batches(self):
+        versions = [get_library_version(pk) for pk in self.library_ids]
+        self.libraries[0].books.add(self.book_ids[0])
+        self.sent.clear()
+        # 2 libraries x 2 books per INSERT; the existing row is skipped.
+        with CaptureQueriesContext(connection) as captured:
+            Library.objects.bulk_assign(self.library_ids, self.book_ids, batch_size=4)
+        inserts = [
+            query for query in captured
+            if query['sql'].startswith('INSERT') and '"relationship_app_library_books"' in query['sql']
+        ]
+        self.assertEqual(len(inserts), 4)
+        self.assertEqual(self.sent, [('assign', self.library_ids, self.book_ids)])
+        for library in self.libraries[:2]:
+            self.assertEqual(self.members(library), self.book_ids)
+            self.assertEqual(self.stats(library), (7, 2))
+        self.assertEqual(self.members(self.libraries[2]), [])
+        for pk, version in zip(self.library_ids, versions):
+            self.assertGreater(get_library_version(pk), version)
+
+    def test_repeated_assign_is_ignored(self):
+        Library.objects.bulk_assign(self.library_ids, self.book_ids)
+        Library.objects.bulk_assign(self.library_ids, self.book_ids[:3])
+        self.assertEqual(len(self.sent), 2)
+        self.assertEqual(self.members(self.libraries[0]), self.book_ids)
+        self.assertEqual(self.stats(self.libraries[0]), (7, 2))
+
+    def test_unassign(self):
+        Library.objects.bulk_assign(self.library_ids, self.book_ids)
+        version = get_library_version(self.library_ids[0])
+        # Every other book: all of Author 0's books go.
+        Library.objects.bulk_unassign(self.library_ids[:1], self.book_ids[::2], batch_size=2)
+        self.assertEqual(self.sent[-1], ('unassign', self.library_ids[:1], self.book_ids[::2]))
+        self.assertEqual(self.members(self.libraries[0]), self.book_ids[1::2])
+        self.assertEqual(self.stats(self.libraries[0]), (3, 1))
+        self.assertEqual(self.stats(self.libraries[1]), (7, 2))
+        self.assertGreater(get_library_version(self.library_ids[0]), version)
+
+
+class SessionBackendTests(TestCase):
+    """
+    With the cached_db backend (the default SESSION_MODE when the sessions
+    cache is shared) a logged-in request reads its session from the cache,
+    not from django_session.
+    """
+    def session_queries(self, mode):
+        with override_settings(SESSION_ENGINE=settings.SESSION_ENGINES[mode]):
+            caches[settings.SESSION_CACHE_ALIAS].clear()
+            # A new client, since SessionMiddleware picks its engine once.
+            client = Client()
+            client.force_login(get_user_model().objects.create_user(email=f'{mode}@example.com', username=mode))
+            client.get(reverse('book-list'))
+            with CaptureQueriesContext(connection) as captured:
+                response = client.get(reverse('book-list'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.wsgi_request.user.email, f'{mode}@example.com')
+        return sum('django_session' in query['sql'] for query in captured)
+
+    def test_cached_db_skips_session_table_when_warm(self):
+        self.assertEqual(self.session_queries('cached_db'), 0)
+        self.assertEqual(self.session_queries('db'), 1)
@@ -1,19 +1,28 @@
+from django.conf import settings
 from django.urls import path
-from .views import CustomLoginView, CustomLogoutView, register, list_books, LibraryDetailView, views
+from . import views
+from .views import CustomLoginView, CustomLogoutView
 from .admin_view import admin_view
 from .librarian_view import librarian_view
 from .member_view import member_view
-from .views import list_books
+
+# Under ASGI the catalog views are served by their native async versions.
+if settings.ASYNC_CATALOG_VIEWS:
+    from . import async_views as catalog_views
+else:
+    from . import views as catalog_views
+
 urlpatterns = [
-    path('books/', list_books, name='book-list'),
-    path('library/<int:pk>/', LibraryDetailView.as_view(), name='library-detail'),
+    path('books/', catalog_views.list_books, name='book-list'),
+    path('books/export/', catalog_views.export_books, name='book-export'),
+    path('library/<int:pk>/', catalog_views.LibraryDetailView.as_view(), name='library-detail'),
     path('login/', CustomLoginView.as_view(template_name="relationship_app/login.html"), name='login'),
     path('logout/', CustomLogoutView.as_view(template_name="relationship_app/logout.html"), name='logout'),
     path('register/', views.register, name='register'),
-    path('admin-area/', admin_view.admin_view, name='admin-view'),
-    path('librarian-area/', librarian_view.librarian_view, name='librarian-view'),
-    path('member-area/', member_view.member_view, name='member-view'),
-    path('add_book/', views.add_book, name='add_book'),
-    path('edit_book/', views.edit_book, name='edit_book'),
-    path('books/delete/<int:book_id>/', views.delete_book, name='delete-book'),
+    path('admin-area/', admin_view, name='admin-view'),
+    path('librarian-area/', librarian_view, name='librarian-view'),
+    path('member-area/', member_view, name='member-view'),
+    path('add_book/', catalog_views.add_book, name='add_book'),
+    path('edit_book/<int:book_id>/', catalog_views.edit_book, name='edit_book'),
+    path('books/delete/<int:book_id>/', catalog_views.delete_book, name='delete-book'),
 ]
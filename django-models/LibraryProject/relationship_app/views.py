@@ -1,4 +1,4 @@
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
 from django.views.generic.detail import DetailView
 from django.contrib.auth import login, logout, authenticate
@@ -9,19 +9,51 @@ from django.contrib.auth.views import LoginView
 from django.contrib.auth.views import LogoutView
 from django.views import View
 from django.contrib.auth.decorators import user_passes_test
-from .models import UserProfile
 from django.shortcuts import render, redirect
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, permission_required
 from .models import Library
 from .models import Book
+from .cache import LIBRARY_PAGE_TIMEOUT, get_cache, get_library_version, library_page_key
+from .conditional import catalog_validators, library_etag, library_last_modified, not_modified, set_validators
+from .roles import is_admin, is_librarian, is_member
+from .export import CONTENT_TYPES, RENDERERS, render_catalog
+from .pagination import DEFAULT_PAGE_SIZE, KeysetPaginator
 
 # Function-based view to list all books
 def list_books(request):
     """
-    Renders a list of all books and their authors.
+    Renders one keyset-paginated page of books and their authors.
+    Pass the opaque ?cursor= token from the next/previous links to move
+    through the catalog; ?page_size= caps the rows per page.
     """
-    books = Book.objects.all()
-    return render(request, 'relationship_app/list_books.html', {'books': books})
+    etag, last_modified = catalog_validators(request)
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        return response
+
+    books = Book.objects.listing()
+    try:
+        paginator = KeysetPaginator(books, request.GET.get('page_size', DEFAULT_PAGE_SIZE))
+        page = paginator.page(request.GET.get('cursor'))
+    except ValueError:
+        return HttpResponseBadRequest('Invalid cursor or page size.')
+    response = render(request, 'relationship_app/list_books.html', {'books': page, 'page': page})
+    return set_validators(response, etag, last_modified)
+
+
+@permission_required('relationship_app.view_book')
+def export_books(request):
+    """
+    Streams the full catalog, with each book's libraries, as CSV or JSONL
+    (?format=jsonl) without loading it into memory. Limited to users with
+    the view_book permission, since one export reads the whole table.
+    """
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in RENDERERS:
+        return HttpResponseBadRequest('Unsupported export format.')
+    response = StreamingHttpResponse(render_catalog(fmt), content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="catalog.{fmt}"'
+    return response
 
 # Class-based view to show details of a specific library
 class LibraryDetailView(DetailView):
@@ -32,24 +64,49 @@ class LibraryDetailView(DetailView):
     template_name = 'relationship_app/library_detail.html'
     context_object_name = 'library'
 
+    def get_queryset(self):
+        # One query for the library and its stats; get_context_data adds
+        # one for the book rows.
+        return Library.objects.select_related('stats')
+
+    def get(self, request, *args, **kwargs):
+        # Serve the rendered page from the cache while the library's version
+        # counter is unchanged; signals.py bumps it on every catalog write.
+        # The same counter is the ETag, so a client holding the current page
+        # gets a 304 without touching the database.
+        pk = kwargs['pk']
+        cache = get_cache()
+        version = get_library_version(pk)
+        key = library_page_key(pk, version)
+        etag = library_etag(pk, version)
+        entry = cache.get(key)
+        if entry is not None:
+            unchanged = not_modified(request, etag, entry['last_modified'])
+            if unchanged is not None:
+                return unchanged
+            return set_validators(HttpResponse(entry['content']), etag, entry['last_modified'])
+
+        response = super().get(request, *args, **kwargs)
+        last_modified = library_last_modified(self.object, response.context_data['books'])
+        unchanged = not_modified(request, etag, last_modified)
+        if unchanged is not None:
+            return unchanged
+        response.add_post_render_callback(
+            lambda r: cache.set(key, {'content': r.content, 'last_modified': last_modified}, LIBRARY_PAGE_TIMEOUT)
+        )
+        return set_validators(response, etag, last_modified)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['books'] = self.object.books.select_related('author').all()
+        # Read-only rows with the copied author name: no join, no model
+        # instances (see BookQuerySet.listing).
+        context['books'] = list(self.object.books.listing())
         return context
     
 
 
 
 
-def is_admin(user):
-    return hasattr(user, 'userprofile') and user.userprofile.role == 'Admin'
-
-def is_librarian(user):
-    return hasattr(user, 'userprofile') and user.userprofile.role == 'Librarian'
-
-def is_member(user):
-    return hasattr(user, 'userprofile') and user.userprofile.role == 'Member'
-
 @user_passes_test(is_admin)
 def admin_view(request):
     return render(request, 'relationship_app/admin_view.html')